@@ -4,12 +4,15 @@ Configuration management for MCP ZIM Server
 Author: mobilemutex
 """
 
+import hashlib
 import os
+from functools import lru_cache
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class ZimServerConfig:
     """Configuration settings for the ZIM server"""
     
@@ -25,40 +28,109 @@ class ZimServerConfig:
     # Cache settings
     content_cache_size: int = 50 * 1024 * 1024  # 50MB
     archive_cache_size: int = 10  # Number of archives to keep open
+    archive_cache_policy: str = "2q"  # "2q" (scan-resistant) or "lru"
+    prewarm_count: int = 2  # Newest archives to open after discovery (0 disables)
+    file_info_cache_size: int = 512  # Number of ZIM file infos to keep
+    entry_cache_size: int = 1024  # Number of resolved entries to keep
     search_cache_size: int = 1000  # Number of search results to cache
+    searcher_cache_size: int = 16  # Number of fulltext searchers to keep open
+    parse_cache_size: int = 16 * 1024 * 1024  # Characters of cleaned HTML text to keep (16M)
+    entry_content_cache_size: int = 128  # Number of read_zim_entry responses to keep
+    resource_cache_ttl: float = 15.0  # Seconds to reuse serialized resources (0 disables)
+    metadata_cache_file: Optional[Path] = None  # Persisted ZIM file info (None disables)
     
     # Performance settings
     max_concurrent_searches: int = 5
+    max_concurrent_tool_calls: int = 8  # Tool calls running in worker threads at once
     enable_parallel_search: bool = True
+    discovery_concurrency: int = 8  # ZIM files opened at once while discovering
+    
+    # Ranking settings
+    zim_weights: Dict[str, float] = field(default_factory=dict)  # filename -> score multiplier
+    
+    # Validation settings
+    strict_file_validation: bool = False  # re-check file access on every call
     
     # Logging settings
     log_level: str = "INFO"
     enable_performance_logging: bool = False
 
 
+def _parse_zim_weights(value: str) -> Dict[str, float]:
+    """Parse ``name.zim=2.0,other.zim=0.5`` into a filename -> weight map"""
+    weights = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        name, sep, weight = item.rpartition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"Invalid ZIM_WEIGHTS entry: {item.strip()!r}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def _default_metadata_cache_file(zim_files_directory: Path, env: Mapping[str, str]) -> Path:
+    """Get the file info cache path for a ZIM directory under the user's cache directory
+    
+    The ZIM directory may be read-only or shared, and writing into it would
+    change the mtime that discovery revalidates against. The file is named
+    after the directory, so servers for different directories keep apart.
+    """
+    cache_home = Path(env.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    digest = hashlib.sha256(str(zim_files_directory).encode("utf-8", "surrogateescape")).hexdigest()[:16]
+    return cache_home / "zim-mcp" / f"file_info_{digest}.json"
+
+
+@lru_cache(maxsize=1)
 def load_config() -> ZimServerConfig:
-    """Load configuration from environment variables and defaults"""
+    """Load configuration from environment variables and defaults
+    
+    The environment is only read once per process; call
+    ``load_config.cache_clear()`` to force a reload.
+    """
+    env = os.environ
     
     # Get ZIM files directory from environment or use default
-    zim_dir = os.getenv("ZIM_FILES_DIRECTORY", "./zim_files")
+    zim_dir = env.get("ZIM_FILES_DIRECTORY", "./zim_files")
     zim_files_directory = Path(zim_dir).resolve()
     
     # Ensure directory exists
     zim_files_directory.mkdir(parents=True, exist_ok=True)
     
+    archive_cache_policy = env.get("ARCHIVE_CACHE_POLICY", "2q").lower()
+    if archive_cache_policy not in ("2q", "lru"):
+        raise ValueError(f"Invalid ARCHIVE_CACHE_POLICY: {archive_cache_policy!r}")
+    
+    # File info persists in the user cache directory unless set to an empty value
+    metadata_cache_file = env.get("METADATA_CACHE_FILE",
+                                  str(_default_metadata_cache_file(zim_files_directory, env)))
+    
     return ZimServerConfig(
         zim_files_directory=zim_files_directory,
-        max_search_results=int(os.getenv("MAX_SEARCH_RESULTS", "100")),
-        search_timeout=int(os.getenv("SEARCH_TIMEOUT", "30")),
-        default_content_format=os.getenv("DEFAULT_CONTENT_FORMAT", "text"),
-        max_content_length=int(os.getenv("MAX_CONTENT_LENGTH", "50000")),
-        content_cache_size=int(os.getenv("CONTENT_CACHE_SIZE", str(50 * 1024 * 1024))),
-        archive_cache_size=int(os.getenv("ARCHIVE_CACHE_SIZE", "10")),
-        search_cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "1000")),
-        max_concurrent_searches=int(os.getenv("MAX_CONCURRENT_SEARCHES", "5")),
-        enable_parallel_search=os.getenv("ENABLE_PARALLEL_SEARCH", "true").lower() == "true",
-        log_level=os.getenv("LOG_LEVEL", "INFO"),
-        enable_performance_logging=os.getenv("ENABLE_PERFORMANCE_LOGGING", "false").lower() == "true"
+        max_search_results=int(env.get("MAX_SEARCH_RESULTS", "100")),
+        search_timeout=int(env.get("SEARCH_TIMEOUT", "30")),
+        default_content_format=env.get("DEFAULT_CONTENT_FORMAT", "text"),
+        max_content_length=int(env.get("MAX_CONTENT_LENGTH", "50000")),
+        content_cache_size=int(env.get("CONTENT_CACHE_SIZE", str(50 * 1024 * 1024))),
+        archive_cache_size=int(env.get("ARCHIVE_CACHE_SIZE", "10")),
+        archive_cache_policy=archive_cache_policy,
+        prewarm_count=int(env.get("PREWARM_COUNT", "2")),
+        file_info_cache_size=int(env.get("FILE_INFO_CACHE_SIZE", "512")),
+        entry_cache_size=int(env.get("ENTRY_CACHE_SIZE", "1024")),
+        search_cache_size=int(env.get("SEARCH_CACHE_SIZE", "1000")),
+        searcher_cache_size=int(env.get("SEARCHER_CACHE_SIZE", "16")),
+        parse_cache_size=int(env.get("PARSE_CACHE_SIZE", str(16 * 1024 * 1024))),
+        entry_content_cache_size=int(env.get("ENTRY_CONTENT_CACHE_SIZE", "128")),
+        resource_cache_ttl=float(env.get("RESOURCE_CACHE_TTL", "15")),
+        metadata_cache_file=Path(metadata_cache_file).expanduser().resolve() if metadata_cache_file else None,
+        max_concurrent_searches=int(env.get("MAX_CONCURRENT_SEARCHES", "5")),
+        max_concurrent_tool_calls=int(env.get("MAX_CONCURRENT_TOOL_CALLS", "8")),
+        enable_parallel_search=env.get("ENABLE_PARALLEL_SEARCH", "true").lower() == "true",
+        discovery_concurrency=int(env.get("DISCOVERY_CONCURRENCY", "8")),
+        zim_weights=_parse_zim_weights(env.get("ZIM_WEIGHTS", "")),
+        strict_file_validation=env.get("ENABLE_STRICT_VALIDATION", "false").lower() == "true",
+        log_level=env.get("LOG_LEVEL", "INFO"),
+        enable_performance_logging=env.get("ENABLE_PERFORMANCE_LOGGING", "false").lower() == "true"
     )
 
 
@@ -4,17 +4,70 @@ Content extraction and formatting for ZIM entries
 Author: mobilemutex
 """
 
+import codecs
+import hashlib
 import logging
 import re
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Any, Union
+from dataclasses import dataclass, replace
 import libzim.reader # pyright: ignore[reportMissingModuleSource]
 from .config import ZimServerConfig
 from .zim_manager import ZimManager
-from .utils import clean_html_content, truncate_text, extract_text_preview
+from .utils import LRUCache, clean_html_content, drop_partial_tag, truncate_text, extract_text_preview
 
 
-@dataclass
+# Precompiled patterns used by the extractor
+_SENTENCE_RE = re.compile(r'[^.!?]+')
+_CHARSET_RE = re.compile(rb'charset=["\']?([\w-]+)', re.IGNORECASE)
+# Tag patterns stop at the next '<' or '>' and captures at the next tag,
+# so each match stays within one tag or text run and scans of unclosed
+# or unbalanced markup stay linear
+_TITLE_RE = re.compile(r'<title[^<>]*>([^<]*)', re.IGNORECASE)
+_DESC_RE = re.compile(r'<meta[^<>]*name=["\']description["\'][^<>]*content=["\']([^"\'<>]*)["\']',
+                      re.IGNORECASE)
+_IMG_RE = re.compile(r'<img[^<>]*>', re.IGNORECASE)
+_LINK_COUNT_RE = re.compile(r'<a\b[^<>]*href=[^<>]*>', re.IGNORECASE)
+_HEADING_TAG_RE = re.compile(r'<(/?)h([1-6])\b([^<>]*)>', re.IGNORECASE)
+_LINK_TAG_RE = re.compile(r'<(/?)a\b([^<>]*)>', re.IGNORECASE)
+_ID_ATTR_RE = re.compile(r'\sid=["\']([^"\'<>]*)["\']', re.IGNORECASE)
+_HREF_ATTR_RE = re.compile(r'href=["\']([^"\'<>]*)["\']', re.IGNORECASE)
+
+# Entry blobs are decoded straight from libzim's buffer
+ContentBuffer = Union[bytes, bytearray, memoryview]
+
+
+def _looks_like_html(content: str) -> bool:
+    """Cheap HTML check that only inspects the head of the content"""
+    head = content[:4096]
+    return '<' in head and '>' in head
+
+
+def _iter_elements(content: str, tag_re: re.Pattern) -> Iterator[Tuple[re.Match, str]]:
+    """Yield the opening tag match and inner HTML of each element matched by tag_re
+    
+    tag_re's first group is the closing slash. A closing tag ends the element
+    opened last; an opening tag abandons one that was never closed. Inner
+    spans never overlap, so one pass over unbalanced markup stays linear.
+    """
+    opening = None
+    for match in tag_re.finditer(content):
+        if not match.group(1):
+            opening = match
+        elif opening is not None:
+            yield opening, content[opening.end():match.start()]
+            opening = None
+
+
+class _HtmlScan(NamedTuple):
+    """Text and metadata derived from one HTML document"""
+    text: str
+    metadata: Dict[str, Any]
+
+
+@dataclass(slots=True)
 class ExtractedContentInfo:
     """Extracted content from a ZIM entry"""
     path: str
@@ -35,16 +88,47 @@ class ContentExtractor:
         self.config = config
         self.zim_manager = zim_manager
         self.logger = logging.getLogger("mcp_zim_server.content_extractor")
+        
+        # HTML scans keyed by a hash of the document, for entries surfaced again
+        # by later queries (including the same article from another ZIM file),
+        # bounded by the total length of their cleaned text
+        self.parse_cache = LRUCache(
+            config.parse_cache_size,
+            getsizeof=lambda scan: len(scan.text) + 1
+        )
+        
+        # Worker pool for batch extraction, created on first use
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        
+        # Cache for extracted content, bounded by total content size.
+        # Entries are immutable within a ZIM file; the manager reports files
+        # that are removed or replaced.
+        self.content_cache = LRUCache(
+            config.content_cache_size,
+            getsizeof=lambda info: len(info.content)
+        )
+        zim_manager.add_invalidation_listener(self._forget_file)
     
     def extract_entry_content(self, zim_file: str, entry_path: str, 
                             format_type: str = "text") -> Optional[ExtractedContentInfo]:
         """Extract content from a ZIM entry"""
         try:
+            cache_key = (zim_file, entry_path, format_type)
+            cached_content = self.content_cache.get(cache_key)
+            if cached_content is not None:
+                self.logger.debug("Using cached content for %s in %s", entry_path, zim_file)
+                return cached_content
+            
             entry = self.zim_manager.get_entry_by_path(zim_file, entry_path)
             if entry is None:
                 return None
             
-            return self._extract_from_entry(entry, format_type)
+            content = self._extract_from_entry(entry, format_type)
+            
+            self.content_cache.put(cache_key, content)
+            
+            return content
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error extracting content from %s in %s: %s", entry_path, zim_file, e)
@@ -68,11 +152,7 @@ class ContentExtractor:
                            format_type: str = "text") -> ExtractedContentInfo:
         """Extract content from a ZIM entry object"""
         try:
-            # Get the item
-            item = entry.get_item()
-            content_bytes = bytes(item.content)
-            
-            # Handle redirects
+            # Handle redirects before touching the content blob
             if entry.is_redirect:
                 return ExtractedContentInfo(
                     path=entry.path,
@@ -86,14 +166,31 @@ class ContentExtractor:
                     metadata={}
                 )
             
+            # Read the blob through its buffer interface, without copying it
+            item = entry.get_item()
+            content_buffer = item.content
+            content_length = len(content_buffer)
+            
             # Decode content
-            content = self._decode_content(content_bytes)
+            content = self._decode_content(content_buffer)
+            
+            # Clean HTML and read its metadata once; the scan feeds the text,
+            # the preview and the metadata. Raw output and non-HTML entries
+            # skip the scan entirely.
+            is_html = self._is_html(item.mimetype, content)
+            scan = self._scan_html(content) if is_html and format_type != "raw" else None
             
             # Format content based on requested type
-            formatted_content = self._format_content(content, format_type)
+            if scan is not None and format_type != "html":
+                formatted_content = scan.text
+            else:
+                formatted_content = self._format_content(content, format_type, is_html)
             
-            # Create preview
-            preview = extract_text_preview(formatted_content, 200)
+            # Create preview, reusing the cleaned text instead of cleaning HTML again
+            if scan is not None:
+                preview = truncate_text(scan.text, 200)
+            else:
+                preview = extract_text_preview(formatted_content, 200)
             
             # Truncate if too long
             if len(formatted_content) > self.config.max_content_length:
@@ -104,40 +201,76 @@ class ContentExtractor:
                 title=entry.title,
                 content=formatted_content,
                 content_type=format_type,
-                content_length=len(content_bytes),
+                content_length=content_length,
                 preview=preview,
                 is_redirect=False,
-                metadata=self._extract_metadata(content)
+                metadata=scan.metadata if scan is not None else {}
             )
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error extracting from entry %s: %s", entry.path, e)
             raise
     
-    def _decode_content(self, content_bytes: bytes) -> str:
-        """Decode content bytes to string"""
+    def _sniff_encoding(self, content_bytes: ContentBuffer) -> Optional[str]:
+        """Detect the content encoding from a BOM or a declared charset"""
+        if content_bytes[:3] == b'\xef\xbb\xbf':
+            return 'utf-8-sig'
+        if content_bytes[:2] in (b'\xff\xfe', b'\xfe\xff'):
+            return 'utf-16'
+        
+        # Look for <meta charset=...> or a Content-Type declaration near the top
+        charset_match = _CHARSET_RE.search(content_bytes, 0, 1024)
+        if charset_match:
+            return charset_match.group(1).decode('ascii')
+        
+        return None
+    
+    def _decode_content(self, content_bytes: ContentBuffer, final: bool = True) -> str:
+        """Decode content bytes (or any byte buffer) to string in a single pass
+        
+        With final=False the bytes are only the head of the content, and a
+        character split at their end is left out instead of decoded to U+FFFD.
+        """
+        encoding = self._sniff_encoding(content_bytes) or 'utf-8'
         try:
-            # Try UTF-8 first
-            return content_bytes.decode('utf-8')
-        except UnicodeDecodeError:
-            try:
-                # Try Latin-1 as fallback
-                return content_bytes.decode('latin-1')
-            except UnicodeDecodeError:
-                # Last resort: replace errors
-                return content_bytes.decode('utf-8', errors='replace')
+            codecs.lookup(encoding)
+        except LookupError:
+            # Unknown charset name declared by the document
+            encoding = 'utf-8'
+        if final:
+            return str(content_bytes, encoding, 'replace')
+        return codecs.getincrementaldecoder(encoding)('replace').decode(content_bytes)
     
-    def _format_content(self, content: str, format_type: str) -> str:
+    def _is_html(self, mimetype: str, content: str) -> bool:
+        """Decide whether content is HTML from its mimetype, or by sniffing its head"""
+        if mimetype:
+            return mimetype.startswith(("text/html", "application/xhtml"))
+        return _looks_like_html(content)
+    
+    def _format_content(self, content: str, format_type: str, is_html: bool = True) -> str:
         """Format content based on requested type"""
-        if format_type == "text":
-            return clean_html_content(content)
-        elif format_type == "html":
-            return content
-        elif format_type == "raw":
+        if format_type in ("html", "raw"):
             return content
-        else:
-            # Default to text
-            return clean_html_content(content)
+        
+        # Text (also the default): plain text only needs whitespace collapsed
+        if not is_html:
+            return ' '.join(content.split())
+        return clean_html_content(content)
+    
+    def _scan_html(self, content: str) -> _HtmlScan:
+        """Clean HTML content and extract its metadata, reusing earlier scans of the same document
+        
+        Text and metadata come from separate regex passes, each running in
+        C. A fused scan collecting text, metadata, headings and links in one
+        Python-level tag loop cost more per document than these passes do;
+        headings and links are only scanned on request.
+        """
+        key =hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        scan = self.parse_cache.get(key)
+        if scan is None:
+            scan = _HtmlScan(clean_html_content(content), self._extract_metadata(content))
+            self.parse_cache.put(key, scan)
+        return scan
     
     def _extract_metadata(self, content: str) -> Dict[str, Any]:
         """Extract metadata from content"""
@@ -146,104 +279,201 @@ class ContentExtractor:
         # Extract basic HTML metadata if present
         if '<' in content and '>' in content:
             # Extract title from HTML
-            title_match = re.search(r'<title[^>]*>(.*?)</title>', content, re.IGNORECASE | re.DOTALL)
+            title_match = _TITLE_RE.search(content)
             if title_match:
                 metadata['html_title'] = title_match.group(1).strip()
             
             # Extract meta description
-            desc_match = re.search(r'<meta[^>]*name=["\']description["\'][^>]*content=["\']([^"\']*)["\']', 
-                                 content, re.IGNORECASE)
+            desc_match = _DESC_RE.search(content)
             if desc_match:
                 metadata['description'] = desc_match.group(1).strip()
             
             # Count images
-            img_count = len(re.findall(r'<img[^>]*>', content, re.IGNORECASE))
+            img_count = sum(1 for _ in _IMG_RE.finditer(content))
             if img_count > 0:
                 metadata['image_count'] = img_count
             
             # Count links
-            link_count = len(re.findall(r'<a[^>]*href=[^>]*>', content, re.IGNORECASE))
+            link_count = sum(1 for _ in _LINK_COUNT_RE.finditer(content))
             if link_count > 0:
                 metadata['link_count'] = link_count
         
         return metadata
     
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Get the extraction worker pool, creating it on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.config.max_concurrent_searches,
+                    thread_name_prefix="zim-extract"
+                )
+            return self._pool
+    
+    def _map(self, func: Callable[[Any], Any], items: List[Any]) -> Iterable[Any]:
+        """Apply func to items, in parallel when enabled"""
+        if self.config.enable_parallel_search and len(items) > 1:
+            return self._get_pool().map(func, items)
+        return map(func, items)
+    
+    def _safe_extract(self, zim_file: str, entry_path: str,
+                      format_type: str) -> Optional[ExtractedContentInfo]:
+        """Extract content from an entry, logging and swallowing failures"""
+        try:
+            return self.extract_entry_content(zim_file, entry_path, format_type)
+        except (OSError, ValueError, RuntimeError) as e:
+            self.logger.warning("Error extracting content from %s: %s", entry_path, e)
+            return None
+    
+    def extract_preview_only(self, zim_file: str, entry_path: str, max_length: int,
+                             format_type: str = "text") -> Optional[ExtractedContentInfo]:
+        """Extract about max_length characters from the start of an entry
+        
+        Only the head of the blob is decoded: the byte window starts at
+        twice max_length and grows until formatting leaves enough text, so
+        large articles are never decoded in full. No metadata is extracted.
+        """
+        entry = self.zim_manager.get_entry_by_path(zim_file, entry_path)
+        if entry is None:
+            return None
+        if entry.is_redirect:
+            return self._extract_from_entry(entry, format_type)
+        
+        item = entry.get_item()
+        view = memoryview(item.content)
+        window = max(2 * max_length, 1024)
+        while True:
+            complete = window >= len(view)
+            content = self._decode_content(view if complete else view[:window], final=complete)
+            is_html = self._is_html(item.mimetype, content)
+            if is_html and not complete and format_type != "html":
+                content = drop_partial_tag(content)
+            
+            formatted_content = self._format_content(content, format_type, is_html)
+            if complete or len(formatted_content) > max_length:
+                break
+            window *= 4
+        
+        return ExtractedContentInfo(
+            path=entry.path,
+            title=entry.title,
+            content=formatted_content,
+            content_type=format_type,
+            content_length=len(view),
+            preview=truncate_text(formatted_content, 200),
+            is_redirect=False,
+            metadata={}
+        )
+    
+    def _safe_extract_preview(self, zim_file: str, entry_path: str, max_length: int,
+                              format_type: str) -> Optional[ExtractedContentInfo]:
+        """Extract an entry preview, logging and swallowing failures"""
+        try:
+            return self.extract_preview_only(zim_file, entry_path, max_length, format_type)
+        except (OSError, ValueError, RuntimeError) as e:
+            self.logger.warning("Error extracting preview from %s: %s", entry_path, e)
+            return None
+    
     def extract_multiple_contents(self, zim_file: str, entry_paths: List[str], 
                                 format_type: str = "text") -> List[ExtractedContentInfo]:
         """Extract content from multiple entries"""
-        results = []
-        
-        for entry_path in entry_paths:
-            try:
-                content = self.extract_entry_content(zim_file, entry_path, format_type)
-                if content:
-                    results.append(content)
-            except (OSError, ValueError, RuntimeError) as e:
-                self.logger.warning("Error extracting content from %s: %s", entry_path, e)
-                continue
-        
-        return results
+        contents = self._map(
+            lambda entry_path: self._safe_extract(zim_file, entry_path, format_type),
+            entry_paths
+        )
+        return [content for content in contents if content]
     
-    def extract_search_results_content(self, search_results: List[Any], 
-                                     format_type: str = "text") -> List[ExtractedContentInfo]:
-        """Extract content from search results"""
-        results = []
-        
-        for search_result in search_results:
-            try:
-                content = self.extract_entry_content(
-                    search_result.zim_file, 
-                    search_result.path, 
-                    format_type
-                )
-                if content:
-                    # Add search-specific metadata
-                    if hasattr(search_result, 'score'):
-                        content.metadata = content.metadata or {}
-                        content.metadata['search_score'] = search_result.score
-                    results.append(content)
-            except (OSError, ValueError, RuntimeError) as e:
-                self.logger.warning("Error extracting search result content: %s", e)
-                continue
+    def extract_search_results_content(self, search_results: List[Any], format_type: str = "text",
+                                       preview_length: Optional[int] = None) -> List[ExtractedContentInfo]:
+        """Extract content from search results, or only a preview of it if preview_length is given"""
+        def extract(search_result: Any) -> Optional[ExtractedContentInfo]:
+            if preview_length is not None:
+                content = self._safe_extract_preview(search_result.zim_file, search_result.path,
+                                                     preview_length, format_type)
+            else:
+                content = self._safe_extract(search_result.zim_file, search_result.path, format_type)
+            if content and hasattr(search_result, 'score'):
+                # Add search-specific metadata on a copy; the original may be cached
+                content = replace(content, metadata={
+                    **(content.metadata or {}),
+                    'search_score': search_result.score
+                })
+            return content
         
-        return results
+        return [content for content in self._map(extract, search_results) if content]
+    
+    def _forget_file(self, filename: Optional[str]) -> None:
+        """Drop extracted content of a removed or replaced ZIM file, or of all files for None"""
+        if filename is None:
+            self.content_cache.clear()
+            return
+        for key, _ in self.content_cache.items():
+            if Path(key[0]).name == filename:
+                self.content_cache.pop(key)
+    
+    def clear_caches(self) -> None:
+        """Clear the extracted content and HTML scan caches"""
+        self.content_cache.clear()
+        self.parse_cache.clear()
+        self.logger.info("Cleared content cache")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get content cache statistics"""
+        return {
+            "content_cache_entries": self.content_cache.size(),
+            "content_cache_size": self.content_cache.current_size,
+            "content_cache_max_size": self.config.content_cache_size,
+            "parse_cache_entries": self.parse_cache.size(),
+            "parse_cache_size": self.parse_cache.current_size,
+            "parse_cache_max_size": self.config.parse_cache_size
+        }
+    
+    def close(self) -> None:
+        """Shut down the extraction worker pool"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
     
     def get_content_summary(self, content: str, max_length: int = 500) -> str:
         """Get a summary of content"""
         # Clean HTML if present
-        if '<' in content and '>' in content:
+        if _looks_like_html(content):
             content = clean_html_content(content)
         
-        # Extract first paragraph or sentences
-        sentences = re.split(r'[.!?]+', content)
-        summary = ""
+        # Extract first sentences, stopping as soon as the budget is spent
+        sentences = []
+        summary_length = 0
         
-        for sentence in sentences:
-            sentence = sentence.strip()
+        for sentence_match in _SENTENCE_RE.finditer(content):
+            sentence = sentence_match.group().strip()
             if not sentence:
                 continue
             
-            if len(summary + sentence) > max_length:
+            if summary_length + len(sentence) > max_length:
                 break
             
-            summary += sentence + ". "
+            sentences.append(sentence)
+            summary_length += len(sentence) + 2  # account for the ". " separator
         
-        return summary.strip()
+        if not sentences:
+            return ""
+        return ". ".join(sentences) + "."
     
     def extract_table_of_contents(self, content: str) -> List[Dict[str, str]]:
         """Extract table of contents from HTML content"""
-        toc = []
-        
-        # Look for heading tags
-        heading_pattern = r'<h([1-6])[^>]*(?:id=["\']([^"\']*)["\'])?[^>]*>(.*?)</h[1-6]>'
-        matches = re.findall(heading_pattern, content, re.IGNORECASE | re.DOTALL)
+        # A plain substring scan is far cheaper than the regex on heading-free content
+        if '<h' not in content and '<H' not in content:
+            return []
         
-        for level, heading_id, heading_text in matches:
+        toc = []
+        for opening, heading_text in _iter_elements(content, _HEADING_TAG_RE):
             clean_text = clean_html_content(heading_text).strip()
             if clean_text:
+                id_match = _ID_ATTR_RE.search(opening.group(3))
                 toc.append({
-                    'level': int(level),
-                    'id': heading_id or '',
+                    'level': int(opening.group(2)),
+                    'id': id_match.group(1) if id_match else '',
                     'text': clean_text
                 })
         
@@ -251,18 +481,18 @@ class ContentExtractor:
     
     def extract_links(self, content: str) -> List[Dict[str, str]]:
         """Extract links from HTML content"""
-        links = []
+        if '<a' not in content and '<A' not in content:
+            return []
         
-        link_pattern = r'<a[^>]*href=["\']([^"\']*)["\'][^>]*>(.*?)</a>'
-        matches = re.findall(link_pattern, content, re.IGNORECASE | re.DOTALL)
-        
-        for href, link_text in matches:
-            clean_text = clean_html_content(link_text).strip()
-            if clean_text and href:
+        links = []
+        for opening, link_text in _iter_elements(content, _LINK_TAG_RE):
+            href_match = _HREF_ATTR_RE.search(opening.group(2))
+            href = href_match.group(1) if href_match else ''
+            clean_text = clean_html_content(link_text).strip() if href else ''
+            if clean_text:
                 links.append({
                     'href': href,
                     'text': clean_text
                 })
         
         return links
-
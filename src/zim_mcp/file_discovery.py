@@ -5,12 +5,14 @@ Author: mobilemutex
 """
 
 import logging
+from array import array
+from bisect import bisect_left
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Any, Set, Tuple
 import os
 import time
 from .config import ZimServerConfig
-from .utils import format_file_size
+from .utils import format_file_size, format_timestamp
 
 
 class FileDiscovery:
@@ -23,6 +25,22 @@ class FileDiscovery:
         # Cache for file discovery results
         self._last_scan_time: Optional[float] = None
         self._scan_cache_duration = 300  # 5 minutes
+        
+        # Last scan results per directory: (scan time, files)
+        self._scan_cache: Dict[Path, Tuple[float, List[Dict[str, Any]]]] = {}
+        
+        # Sorted lowercase filenames of the configured directory, with the
+        # matching file info at the same position, for prefix lookups
+        self._names_lower: List[str] = []
+        self._sorted_files: List[Dict[str, Any]] = []
+        
+        # Relative paths of .zim files seen (and readable) in the last scan
+        self._valid_set: Set[str] = set()
+        self._readable_set: Set[str] = set()
+        
+        # Column copies of size/mtime from the last scan, for aggregation
+        self._sizes = array('q')
+        self._mtimes = array('d')
     
     def discover_files(self, directory: Optional[Path] = None, 
                       force_refresh: bool = False) -> List[Dict[str, Any]]:
@@ -32,11 +50,13 @@ class FileDiscovery:
             
             # Check if we need to refresh
             current_time = time.time()
-            if (not force_refresh and 
-                self._last_scan_time and 
-                current_time - self._last_scan_time < self._scan_cache_duration):
-                self.logger.debug("Using cached file discovery results")
-                return self._get_cached_results(scan_directory)
+            if force_refresh:
+                self._scan_cache.pop(scan_directory, None)
+            else:
+                cached = self._scan_cache.get(scan_directory)
+                if cached is not None and current_time - cached[0] < self._scan_cache_duration:
+                    self.logger.debug("Using cached file discovery results")
+                    return self._get_cached_results(scan_directory)
             
             self.logger.info("Discovering ZIM files in %s", scan_directory)
             
@@ -47,57 +67,96 @@ class FileDiscovery:
             files = []
             
             # Scan for .zim files
-            for file_path in scan_directory.rglob("*.zim"):
+            for entry in self._iter_zim(scan_directory):
                 try:
-                    file_info = self._get_file_info(file_path)
+                    file_info = self._get_file_info(entry)
                     files.append(file_info)
                 except (OSError, ValueError) as e:
-                    self.logger.warning("Error processing file %s: %s", file_path, e)
+                    self.logger.warning("Error processing file %s: %s", entry.path, e)
                     continue
             
             # Sort by filename
             files.sort(key=lambda x: x['filename'])
             
             self._last_scan_time = current_time
+            self._scan_cache[scan_directory] = (current_time, files)
+            if scan_directory == self.config.zim_files_directory:
+                self._index_scan(files)
             self.logger.info("Discovered %d ZIM files", len(files))
             
-            return files
+            return list(files)
             
         except (OSError, ValueError) as e:
             self.logger.error("Error discovering files: %s", e)
             return []
     
-    def _get_file_info(self, file_path: Path) -> Dict[str, Any]:
+    def _iter_zim(self, root: Path) -> Iterator[os.DirEntry]:
+        """Recursively yield directory entries for .zim files below root"""
+        stack = [str(root)]
+        
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.name.endswith('.zim') and entry.is_file():
+                                yield entry
+                        except OSError as e:
+                            self.logger.warning("Error reading entry %s: %s", entry.path, e)
+            except OSError as e:
+                self.logger.warning("Error scanning directory %s: %s", directory, e)
+    
+    def _get_file_info(self, entry: os.DirEntry) -> Dict[str, Any]:
         """Get basic information about a file"""
         try:
-            stat = file_path.stat()
+            stat = entry.stat()
             
             return {
-                'filename': file_path.name,
-                'filepath': str(file_path),
+                'filename': entry.name,
+                'filepath': entry.path,
                 'size': stat.st_size,
                 'size_formatted': format_file_size(stat.st_size),
                 'modified_time': stat.st_mtime,
-                'modified_time_formatted': time.strftime(
-                    '%Y-%m-%d %H:%M:%S', 
-                    time.localtime(stat.st_mtime)
-                ),
-                'is_readable': os.access(file_path, os.R_OK),
-                'relative_path': str(file_path.relative_to(self.config.zim_files_directory))
+                'modified_time_formatted': format_timestamp(stat.st_mtime),
+                'is_readable': os.access(entry.path, os.R_OK),
+                'relative_path': str(Path(entry.path).relative_to(self.config.zim_files_directory))
             }
             
         except (OSError, ValueError) as e:
-            self.logger.error("Error getting file info for %s: %s", file_path, e)
+            self.logger.error("Error getting file info for %s: %s", entry.path, e)
             raise
     
+    def _index_scan(self, files: List[Dict[str, Any]]) -> None:
+        """Rebuild lookup structures for a scan of the configured directory"""
+        # Sorted filename index used for prefix lookups
+        indexed = sorted(((f['filename'].lower(), f) for f in files), key=lambda item: item[0])
+        self._names_lower = [name for name, _ in indexed]
+        self._sorted_files = [file_info for _, file_info in indexed]
+        
+        # Access validation sets
+        self._valid_set = {f['relative_path'] for f in files}
+        self._readable_set = {f['relative_path'] for f in files if f['is_readable']}
+        
+        # Numeric columns
+        self._sizes = array('q', (f['size'] for f in files))
+        self._mtimes = array('d', (f['modified_time'] for f in files))
+    
     def _get_cached_results(self, directory: Path) -> List[Dict[str, Any]]:
-        """Get cached discovery results (placeholder for now)"""
-        # In a real implementation, you'd store and retrieve cached results
-        # For now, just return empty list to force fresh scan
-        return []
+        """Get cached discovery results for a directory"""
+        cached = self._scan_cache.get(directory)
+        if cached is None:
+            return []
+        return list(cached[1])
     
     def validate_file_access(self, filename: str) -> bool:
         """Validate that a file can be accessed"""
+        # Trust the last scan for files it saw; anything else is checked on disk
+        if not self.config.strict_file_validation and filename in self._valid_set:
+            return filename in self._readable_set
+        
         try:
             file_path = self.config.zim_files_directory / filename
             
@@ -140,18 +199,9 @@ class FileDiscovery:
                 'created_time': stat.st_ctime,
                 'modified_time': stat.st_mtime,
                 'accessed_time': stat.st_atime,
-                'created_time_formatted': time.strftime(
-                    '%Y-%m-%d %H:%M:%S', 
-                    time.localtime(stat.st_ctime)
-                ),
-                'modified_time_formatted': time.strftime(
-                    '%Y-%m-%d %H:%M:%S', 
-                    time.localtime(stat.st_mtime)
-                ),
-                'accessed_time_formatted': time.strftime(
-                    '%Y-%m-%d %H:%M:%S', 
-                    time.localtime(stat.st_atime)
-                ),
+                'created_time_formatted': format_timestamp(stat.st_ctime),
+                'modified_time_formatted': format_timestamp(stat.st_mtime),
+                'accessed_time_formatted': format_timestamp(stat.st_atime),
                 'permissions': oct(stat.st_mode)[-3:],
                 'is_readable': os.access(file_path, os.R_OK),
                 'is_writable': os.access(file_path, os.W_OK)
@@ -162,10 +212,27 @@ class FileDiscovery:
             return None
     
     def find_files_by_pattern(self, pattern: str) -> List[Dict[str, Any]]:
-        """Find files matching a pattern"""
+        """Find files matching a pattern
+        
+        Patterns match anywhere in the filename (case-insensitive). A pattern
+        ending in a single ``*`` only matches filenames starting with the
+        preceding text, which is answered from the sorted filename index.
+        """
         try:
             files = self.discover_files()
             
+            # Prefix query: binary search into the sorted names
+            if pattern.endswith('*') and '*' not in pattern[:-1]:
+                prefix = pattern[:-1].lower()
+                matching_files = []
+                
+                index = bisect_left(self._names_lower, prefix)
+                while index < len(self._names_lower) and self._names_lower[index].startswith(prefix):
+                    matching_files.append(self._sorted_files[index])
+                    index += 1
+                
+                return matching_files
+            
             # Simple pattern matching (case-insensitive)
             pattern_lower = pattern.lower()
             matching_files = []
@@ -192,19 +259,34 @@ class FileDiscovery:
                     'error': f"Directory does not exist: {directory}"
                 }
             
-            files = self.discover_files()
+            # Refreshes the size and mtime columns when the scan is stale
+            self.discover_files()
             
-            total_size = sum(f['size'] for f in files)
+            sizes = self._sizes
+            total_size = sum(sizes)
+            average_size = total_size // len(sizes) if sizes else 0
+            max_size = max(sizes) if sizes else 0
+            mtimes = self._mtimes
+            newest_time = max(mtimes) if mtimes else None
+            oldest_time = min(mtimes) if mtimes else None
             
             return {
                 'directory_exists': True,
                 'directory_path': str(directory),
-                'total_files': len(files),
+                'total_files': len(sizes),
                 'total_size': total_size,
                 'total_size_formatted': format_file_size(total_size),
+                'average_size': average_size,
+                'average_size_formatted': format_file_size(average_size),
+                'max_size': max_size,
+                'max_size_formatted': format_file_size(max_size),
+                'newest_modified_time': newest_time,
+                'newest_modified_time_formatted': format_timestamp(newest_time) if mtimes else None,
+                'oldest_modified_time': oldest_time,
+                'oldest_modified_time_formatted': format_timestamp(oldest_time) if mtimes else None,
                 'last_scan_time': self._last_scan_time,
                 'last_scan_time_formatted': (
-                    time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._last_scan_time))
+                    format_timestamp(self._last_scan_time)
                     if self._last_scan_time else None
                 )
             }
@@ -1,8 +1,11 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 # Pydantic Models for structured responses
-class ZimFileInfo(BaseModel):
+class ResponseModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
+class ZimFileInfo(ResponseModel):
     filename: str
     title: str
     description: str
@@ -15,7 +18,7 @@ class ZimFileInfo(BaseModel):
     has_fulltext_index: bool
     has_title_index: bool
 
-class ZimMetadata(BaseModel):
+class ZimMetadata(ResponseModel):
     filename: str
     title: str
     description: str
@@ -30,15 +33,15 @@ class ZimMetadata(BaseModel):
     has_title_index: bool
     uuid: str
 
-class CacheInfo(BaseModel):
+class CacheInfo(ResponseModel):
     is_cached: bool
 
-class ZimFileMetadataResponse(BaseModel):
+class ZimFileMetadataResponse(ResponseModel):
     status: str
     metadata: ZimMetadata
     cache_info: CacheInfo
 
-class ZimEntryContent(BaseModel):
+class ZimEntryContent(ResponseModel):
     path: str
     title: str
     content: str
@@ -46,11 +49,11 @@ class ZimEntryContent(BaseModel):
     format: str
     is_redirect: bool
 
-class ZimEntryResponse(BaseModel):
+class ZimEntryResponse(ResponseModel):
     status: str
     entry: ZimEntryContent
 
-class SearchResult(BaseModel):
+class SearchResult(ResponseModel):
     zim_file: str
     path: str
     title: str
@@ -58,19 +61,19 @@ class SearchResult(BaseModel):
     preview: str
     is_redirect: bool
 
-class SearchPagination(BaseModel):
+class SearchPagination(ResponseModel):
     start_offset: int
     max_results: int
     has_more: bool
 
-class SearchResponse(BaseModel):
+class SearchResponse(ResponseModel):
     status: str
     query: str
     count: int
     results: List[SearchResult]
     pagination: SearchPagination
 
-class ExtractedContent(BaseModel):
+class ExtractedContent(ResponseModel):
     path: str
     title: str
     content: str
@@ -80,19 +83,19 @@ class ExtractedContent(BaseModel):
     is_redirect: bool
     metadata: Dict[str, Any]
 
-class SearchAndExtractResponse(BaseModel):
+class SearchAndExtractResponse(ResponseModel):
     status: str
     query: str
     count: int
     results: List[ExtractedContent]
     format: str
 
-class BrowsedEntry(BaseModel):
+class BrowsedEntry(ResponseModel):
     path: str
     title: str
     is_redirect: bool
 
-class BrowseResponse(BaseModel):
+class BrowseResponse(ResponseModel):
     status: str
     zim_file: str
     path_pattern: Optional[str]
@@ -100,18 +103,18 @@ class BrowseResponse(BaseModel):
     count: int
     entries: List[BrowsedEntry]
 
-class RandomEntry(BaseModel):
+class RandomEntry(ResponseModel):
     zim_file: str
     path: str
     title: str
     is_redirect: bool
 
-class RandomEntriesResponse(BaseModel):
+class RandomEntriesResponse(ResponseModel):
     status: str
     count: int
     entries: List[RandomEntry]
 
-class ListZimFilesResponse(BaseModel):
+class ListZimFilesResponse(ResponseModel):
     status: str
     count: int
     files: List[ZimFileInfo]
@@ -4,24 +4,143 @@ Search engine for ZIM files
 Author: mobilemutex
 """
 
+import heapq
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from itertools import chain, islice
+from operator import attrgetter, itemgetter
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Any
 import libzim.search # pyright: ignore[reportMissingModuleSource]
+import libzim.suggestion # pyright: ignore[reportMissingModuleSource]
 from .config import ZimServerConfig
 from .zim_manager import ZimManager
-from .utils import LRUCache, validate_search_query, timing_decorator
+from .utils import KeyedLocks, LRUCache, TinyLFUCache, validate_search_query, timing_decorator
 
 
-@dataclass
-class SearchEngineResult:
+# Browsing by pattern checks at most this many entries in path order, then
+# falls back to random samples
+_BROWSE_SCAN_LIMIT = 20000
+
+
+class SearchEngineResult(NamedTuple):
     """Search result from ZIM file"""
     zim_file: str
     path: str
     title: str
-    score: float = 0.0
+    score: float = 0.0  # zim weight / (rank + 1)
     preview: str = ""
     is_redirect: bool = False
+    rank: int = 0  # Position in its own file's libzim result list
+
+
+class _SharedSearch:
+    """A libzim Search shared between threads, which take turns using it
+    
+    A cached Search serves the worker pool and request threads alike, but
+    libzim does not guard one Search against concurrent use.
+    """
+    
+    __slots__ = ('_search', '_lock')
+    
+    def __init__(self, search: libzim.search.Search):
+        self._search = search
+        self._lock = threading.Lock()
+    
+    def estimated_matches(self) -> int:
+        """Get the estimated number of matches"""
+        with self._lock:
+            return self._search.getEstimatedMatches()
+    
+    def result_paths(self, start_offset: int, max_results: int) -> List[str]:
+        """Get the paths of a page of hits, read in full while the search is held"""
+        with self._lock:
+            return list(self._search.getResults(start_offset, max_results))
+
+
+def _compile_substring(pattern: str) -> Callable[[str], Optional[re.Match]]:
+    """Compile a case-insensitive substring match, once per browse call"""
+    return re.compile(re.escape(pattern), re.IGNORECASE).search
+
+
+class ZimFileTable:
+    """Append-only table mapping interned ZIM filenames to small integer ids"""
+    
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+    
+    def id_of(self, zim_file: str) -> int:
+        """Get the id of a ZIM filename, assigning one on first sight"""
+        file_id = self._ids.get(zim_file)
+        if file_id is None:
+            with self._lock:
+                file_id = self._ids.get(zim_file)
+                if file_id is None:
+                    file_id = len(self._names)
+                    self._names.append(sys.intern(zim_file))
+                    self._ids[self._names[file_id]] = file_id
+        return file_id
+    
+    def __getitem__(self, file_id: int) -> str:
+        return self._names[file_id]
+
+
+class SearchResultSet:
+    """Column-wise storage for a list of search results
+    
+    Cached result lists are kept as parallel columns instead of one tuple
+    per hit, and only turned back into SearchEngineResult objects when
+    read. ZIM filenames are stored as uint16 ids into a shared
+    ZimFileTable, widened only if a table ever outgrows that range.
+    Previews are not stored; the search engine never fills them.
+    """
+    
+    __slots__ = ('zim_file_table', 'zim_file_ids', 'paths', 'titles', 'scores', 'ranks', 'redirects')
+    
+    def __init__(self, results: Iterable[SearchEngineResult], zim_file_table: ZimFileTable):
+        self.zim_file_table = zim_file_table
+        self.zim_file_ids = array('H')
+        self.paths: List[str] = []
+        self.titles: List[str] = []
+        self.scores = array('d')
+        self.ranks = array('q')
+        self.redirects = bytearray()
+        
+        file_id_of = zim_file_table.id_of
+        for result in results:
+            file_id = file_id_of(result.zim_file)
+            try:
+                self.zim_file_ids.append(file_id)
+            except OverflowError:
+                self.zim_file_ids = array('L', self.zim_file_ids)
+                self.zim_file_ids.append(file_id)
+            self.paths.append(result.path)
+            self.titles.append(result.title)
+            self.scores.append(result.score)
+            self.ranks.append(result.rank)
+            self.redirects.append(result.is_redirect)
+    
+    def __len__(self) -> int:
+        return len(self.paths)
+    
+    def to_results(self) -> List[SearchEngineResult]:
+        """Materialize the stored hits as SearchEngineResult objects"""
+        zim_file_table = self.zim_file_table
+        return [
+            SearchEngineResult(zim_file_table[file_id], path, title, score,
+                               is_redirect=bool(redirect), rank=rank)
+            for file_id, path, title, score, redirect, rank in zip(
+                self.zim_file_ids, self.paths, self.titles, self.scores, self.redirects, self.ranks
+            )
+        ]
 
 
 class SearchEngine:
@@ -32,36 +151,104 @@ class SearchEngine:
         self.zim_manager = zim_manager
         self.logger = logging.getLogger("mcp_zim_server.search_engine")
         
-        # Cache for search results
-        self.search_cache = LRUCache(config.search_cache_size)
+        # Cache for search results; TinyLFU keeps paging scans from flushing hot queries
+        self.search_cache = TinyLFUCache(config.search_cache_size)
+        self._zim_file_table = ZimFileTable()
+        
+        # Prepared libzim searches, shared by result and match-count lookups
+        # and used by one thread at a time, and the queries they were built
+        # from, shared across ZIM files
+        self._search_cache = LRUCache(64)
+        self._query_cache = LRUCache(64)
         
-        # Cache for searchers
-        self.searcher_cache: Dict[str, libzim.search.Searcher] = {}
+        # Cache for searchers, built under a per-file lock; evicted searchers
+        # release their index mappings once garbage collected
+        self.searcher_cache = LRUCache(config.searcher_cache_size, on_evict=self._on_searcher_evicted)
+        self._searcher_locks = KeyedLocks()
+        zim_manager.add_invalidation_listener(self._forget_file)
+        
+        # Multi-file searches currently running, so identical requests can share them
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Worker pool for multi-file searches, created on first use
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+    
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """Get the search worker pool, creating it on first use"""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.config.max_concurrent_searches,
+                    thread_name_prefix="zim-search"
+                )
+            return self._pool
+    
+    def _cache_get(self, key: Any) -> Optional[List[SearchEngineResult]]:
+        """Look up cached search results"""
+        result_set = self.search_cache.get(key)
+        return result_set.to_results() if result_set is not None else None
+    
+    def _cache_put(self, key: Any, results: List[SearchEngineResult]) -> None:
+        """Store search results in the cache"""
+        self.search_cache.put(key, SearchResultSet(results, self._zim_file_table))
     
     def _get_searcher(self, zim_file: str) -> Optional[libzim.search.Searcher]:
         """Get or create a searcher for a ZIM file"""
         try:
-            if zim_file in self.searcher_cache:
-                return self.searcher_cache[zim_file]
-            
-            archive = self.zim_manager.get_archive(zim_file)
-            if archive is None:
-                return None
-            
-            # Check if archive has search index
-            if not archive.has_fulltext_index:
-                self.logger.warning("ZIM file %s does not have a fulltext index", zim_file)
-                return None
-            
-            searcher = libzim.search.Searcher(archive)
-            self.searcher_cache[zim_file] = searcher
-            
-            return searcher
+            searcher = self.searcher_cache.get(zim_file)
+            if searcher is not None:
+                return searcher
+            
+            with self._searcher_locks.get(zim_file):
+                # Another thread may have built it while we waited
+                searcher = self.searcher_cache.get(zim_file)
+                if searcher is not None:
+                    return searcher
+                
+                archive = self.zim_manager.get_archive(zim_file)
+                if archive is None:
+                    return None
+                
+                # Check if archive has search index
+                if not archive.has_fulltext_index:
+                    self.logger.warning("ZIM file %s does not have a fulltext index", zim_file)
+                    return None
+                
+                searcher = libzim.search.Searcher(archive)
+                self.searcher_cache.put(zim_file, searcher)
+                
+                return searcher
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error creating searcher for %s: %s", zim_file, e)
             return None
     
+    def _on_searcher_evicted(self, zim_file: str, searcher: libzim.search.Searcher) -> None:
+        """Drop an evicted searcher; it is rebuilt from the cached archive on next use"""
+        self.logger.debug("Evicted searcher for %s", zim_file)
+    
+    def _get_query(self, clean_query: str) -> libzim.search.Query:
+        """Get the parsed query for a query string, shared by every ZIM file searched"""
+        query = self._query_cache.get(clean_query)
+        if query is None:
+            query = libzim.search.Query().set_query(clean_query)
+            self._query_cache.put(clean_query, query)
+        return query
+    
+    def _get_search(self, zim_file: str, searcher: libzim.search.Searcher,
+                    clean_query: str) -> _SharedSearch:
+        """Get or run the libzim search for a query in a ZIM file"""
+        key = (zim_file, clean_query)
+        search = self._search_cache.get(key)
+        if search is not None:
+            return search
+        
+        search = _SharedSearch(searcher.search(self._get_query(clean_query)))
+        self._search_cache.put(key, search)
+        return search
+    
     @timing_decorator
     def search_single_zim(self, zim_file: str, query: str, max_results: int = 20, 
                          start_offset: int = 0) -> List[SearchEngineResult]:
@@ -70,95 +257,287 @@ class SearchEngine:
             # Validate query
             clean_query = validate_search_query(query)
             
+            results = self._search_single_zim(zim_file, clean_query, max_results, start_offset)
+            return results if results is not None else []
+            
+        except (OSError, ValueError, RuntimeError) as e:
+            self.logger.error("Error searching %s for '%s': %s", zim_file, query, e)
+            return []
+    
+    def _search_single_zim(self, zim_file: str, clean_query: str, max_results: int,
+                           start_offset: int) -> Optional[List[SearchEngineResult]]:
+        """Search within a single ZIM file for a validated query
+        
+        Returns None, and caches nothing, if the file could not be searched:
+        it may be added or repaired later.
+        """
+        # Check cache
+        cache_key = (zim_file, clean_query, max_results, start_offset)
+        cached_results = self._cache_get(cache_key)
+        if cached_results is not None:
+            return cached_results
+        
+        opened = self._open_search(zim_file, clean_query)
+        if opened is None:
+            return None
+        
+        results = list(self._iter_search_results(zim_file, *opened, max_results, start_offset))
+        self._cache_put(cache_key, results)
+        
+        self.logger.debug("Found %d results in %s for query: %s", len(results), zim_file, clean_query)
+        return results
+    
+    def _open_search(self, zim_file: str, clean_query: str) -> Optional[Tuple[_SharedSearch, Any]]:
+        """Get the libzim search for a query in a ZIM file, with the archive its hits are read from
+        
+        Returns None if the file cannot be searched.
+        """
+        try:
             # Get searcher
             searcher = self._get_searcher(zim_file)
             if searcher is None:
                 self.logger.warning("Cannot search %s: no searcher available", zim_file)
-                return []
+                return None
             
-            # Create search query
-            search_query = libzim.search.Query().set_query(clean_query)
+            # The archive may have been dropped since the searcher was built
+            archive = self.zim_manager.get_archive(zim_file)
+            if archive is None:
+                self.logger.warning("Cannot search %s: archive unavailable", zim_file)
+                return None
             
             # Perform search
-            search = searcher.search(search_query)
+            return self._get_search(zim_file, searcher, clean_query), archive
+            
+        except (OSError, ValueError, RuntimeError) as e:
+            self.logger.error("Error searching %s for '%s': %s", zim_file, clean_query, e)
+            return None
+    
+    def _iter_search_results(self, zim_file: str, search: _SharedSearch, archive: Any,
+                             max_results: int, start_offset: int) -> Iterator[SearchEngineResult]:
+        """Yield the hits of a libzim search, resolving entries only as they are consumed"""
+        try:
+            # Nothing to page through for queries without matches
+            if search.estimated_matches() == 0:
+                return
             
             # Get results
-            result_set = search.getResults(start_offset, max_results)
+            result_paths = search.result_paths(start_offset, max_results)
             
-            results = []
-            archive = self.zim_manager.get_archive(zim_file)
+            get_entry = archive.get_entry_by_path
+            weight = self.config.zim_weights.get(zim_file, 1.0)
             
-            for path in result_set:
+            # All hits from this file share one filename string
+            zim_file = self._zim_file_table[self._zim_file_table.id_of(zim_file)]
+            
+            # _make builds the tuple directly, skipping keyword argument handling
+            make_result = SearchEngineResult._make
+            
+            for rank, path in enumerate(result_paths, start_offset):
                 try:
-                    entry = archive.get_entry_by_path(path)
-                    if entry:
-                        result = SearchEngineResult(
-                            zim_file=zim_file,
-                            path=path,
-                            title=entry.title,
-                            is_redirect=entry.is_redirect
-                        )
-                        results.append(result)
+                    entry = get_entry(path)
                 except (KeyError, ValueError, RuntimeError) as e:
                     self.logger.warning("Error processing search result %s: %s", path, e)
                     continue
-            
-            self.logger.debug("Found %d results in %s for query: %s", len(results), zim_file, clean_query)
-            return results
-            
+                
+                yield make_result((zim_file, path, entry.title, weight / (rank + 1), "", entry.is_redirect, rank))
+                
         except (OSError, ValueError, RuntimeError) as e:
-            self.logger.error("Error searching %s for '%s': %s", zim_file, query, e)
-            return []
+            self.logger.error("Error reading results from %s: %s", zim_file, e)
     
     @timing_decorator
     def search_multiple_zim(self, zim_files: List[str], query: str, 
                            max_results: int = 20, start_offset: int = 0) -> List[SearchEngineResult]:
         """Search across multiple ZIM files"""
         try:
+            # One stat, unless the directory changed; added, removed and
+            # replaced files then drop their cached results
+            self.zim_manager.discover_zim_files()
+            
+            # Check cache under the arguments as given before doing any other work
+            raw_key = (tuple(zim_files), query, max_results, start_offset)
+            cached_results = self._cache_get(raw_key)
+            if cached_results is not None:
+                return cached_results
+            
             # Validate query
             clean_query = validate_search_query(query)
             
-            # Check cache
-            cache_key = f"{','.join(sorted(zim_files))}|{clean_query}|{max_results}|{start_offset}"
-            cached_results = self.search_cache.get(cache_key)
+            # Check cache under the normalized key
+            cache_key = (tuple(sorted(map(sys.intern, zim_files))), clean_query, max_results, start_offset)
+            cached_results = self._cache_get(cache_key)
             if cached_results is not None:
                 self.logger.debug("Using cached search results for: %s", clean_query)
+                self._cache_put(raw_key, cached_results)
                 return cached_results
             
-            all_results = []
-            
-            if self.config.enable_parallel_search and len(zim_files) > 1:
-                # Parallel search (simplified for now)
-                for zim_file in zim_files:
-                    file_results = self.search_single_zim(
-                        zim_file, clean_query, max_results, 0
-                    )
-                    all_results.extend(file_results)
-            else:
-                # Sequential search
-                for zim_file in zim_files:
-                    file_results = self.search_single_zim(
-                        zim_file, clean_query, max_results, 0
-                    )
-                    all_results.extend(file_results)
-            
-            # Sort results by relevance (basic implementation)
-            # For now, just sort by title length as a simple relevance metric
-            all_results.sort(key=lambda r: len(r.title))
+            # Join an identical search that is already running
+            with self._inflight_lock:
+                future = self._inflight.get(cache_key)
+                is_leader = future is None
+                if is_leader:
+                    future = Future()
+                    self._inflight[cache_key] = future
             
-            # Apply pagination
-            paginated_results = all_results[start_offset:start_offset + max_results]
+            if not is_leader:
+                self.logger.debug("Waiting for in-flight search for: %s", clean_query)
+                return list(future.result())
             
-            # Cache results
-            self.search_cache.put(cache_key, paginated_results)
+            try:
+                paginated_results, complete = self._run_search(zim_files, clean_query, max_results, start_offset)
+                
+                # Cache results, unless a file timed out and is missing from them
+                if complete:
+                    self._cache_put(cache_key, paginated_results)
+                    self._cache_put(raw_key, paginated_results)
+                future.set_result(paginated_results)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[cache_key]
             
             self.logger.info("Search for '%s' returned %d results", clean_query, len(paginated_results))
-            return paginated_results
+            return list(paginated_results)
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error searching multiple ZIM files for '%s': %s", query, e)
             return []
     
+    def _run_search(self, zim_files: List[str], clean_query: str, max_results: int,
+                    start_offset: int) -> Tuple[List[SearchEngineResult], bool]:
+        """Search ZIM files and return one page of merged results
+        
+        Also returns whether every file was searched in full, i.e. none of
+        them timed out or could not be searched.
+        """
+        if len(zim_files) == 1:
+            # libzim pages a single file itself
+            results = self._search_single_zim(zim_files[0], clean_query, max_results, start_offset)
+            return results or [], results is not None
+        
+        needed = start_offset + max_results
+        complete = True
+        if self.config.enable_parallel_search:
+            streams, complete = self._collect_results(zim_files, clean_query, needed)
+        else:
+            # Lazy per-file streams: the merge stops resolving entries once the page is full
+            streams = []
+            for zim_file in zim_files:
+                opened = self._open_search(zim_file, clean_query)
+                if opened is None:
+                    complete = False
+                    continue
+                streams.append(self._iter_search_results(zim_file, *opened, needed, 0))
+        
+        # Each stream is already in descending score order; ties keep file order
+        merged = heapq.merge(*streams, key=attrgetter('score'), reverse=True)
+        
+        # Apply pagination
+        return list(islice(merged, start_offset, needed)), complete
+    
+    def _collect_results(self, zim_files: List[str], clean_query: str,
+                         needed: int) -> Tuple[List[List[SearchEngineResult]], bool]:
+        """Gather every hit the top `needed` merged results can draw from each ZIM file
+        
+        Also returns False if a file timed out or could not be searched; its
+        hits are then missing.
+        """
+        per_file: Dict[str, List[SearchEngineResult]] = {zim_file: [] for zim_file in zim_files}
+        fetched = dict.fromkeys(zim_files, 0)
+        # Files that ran out of hits, with the number of hits they had
+        hit_counts: Dict[str, int] = {}
+        complete = True
+        
+        while True:
+            quotas = self._merge_quotas(zim_files, needed, hit_counts)
+            windows = {
+                zim_file: (fetched[zim_file], quota - fetched[zim_file])
+                for zim_file, quota in quotas.items()
+                if zim_file not in hit_counts and quota > fetched[zim_file]
+            }
+            if not windows:
+                break
+            
+            found = self._search_files(windows, clean_query)
+            for zim_file, (_, count) in windows.items():
+                results = found.get(zim_file)
+                if results is None:
+                    # Timed out or unavailable: give up on the file for this search
+                    complete = False
+                    hit_counts[zim_file] = len(per_file[zim_file])
+                    continue
+                per_file[zim_file].extend(results)
+                fetched[zim_file] += count
+                if len(results) < count:
+                    # Short window: the file has no more hits
+                    hit_counts[zim_file] = len(per_file[zim_file])
+        
+        return [per_file[zim_file] for zim_file in zim_files], complete
+    
+    def _merge_quotas(self, zim_files: List[str], needed: int,
+                      hit_counts: Dict[str, int]) -> Dict[str, int]:
+        """Count the hits of each ZIM file that make the top `needed` merged results
+        
+        A hit's score depends only on its file's weight and its rank, so the
+        merge can be played out before fetching anything. Files listed in
+        hit_counts hold only that many hits; ties keep file order, as in
+        the merge itself.
+        """
+        weights = self.config.zim_weights
+        
+        def scores(zim_file: str) -> Iterator[tuple]:
+            weight = weights.get(zim_file, 1.0)
+            return ((weight / (rank + 1), zim_file) for rank in range(hit_counts.get(zim_file, needed)))
+        
+        quotas = dict.fromkeys(zim_files, 0)
+        merged = heapq.merge(*map(scores, zim_files), key=itemgetter(0), reverse=True)
+        for _, zim_file in islice(merged, needed):
+            quotas[zim_file] += 1
+        return quotas
+    
+    def _search_files(self, windows: Dict[str, Tuple[int, int]],
+                      clean_query: str) -> Dict[str, Optional[List[SearchEngineResult]]]:
+        """Search a (start offset, count) window of hits in each of several ZIM files
+        
+        Files that could not be searched map to None.
+        """
+        if self.config.enable_parallel_search and len(windows) > 1:
+            return self._search_parallel(windows, clean_query)
+        return self._search_sequential(windows, clean_query)
+    
+    def _search_sequential(self, windows: Dict[str, Tuple[int, int]],
+                           clean_query: str) -> Dict[str, Optional[List[SearchEngineResult]]]:
+        """Search ZIM files one after another"""
+        return {
+            zim_file: self._search_single_zim(zim_file, clean_query, count, start_offset)
+            for zim_file, (start_offset, count) in windows.items()
+        }
+    
+    def _search_parallel(self, windows: Dict[str, Tuple[int, int]],
+                         clean_query: str) -> Dict[str, Optional[List[SearchEngineResult]]]:
+        """Search ZIM files concurrently, one worker task per file; files that time out are left out"""
+        try:
+            pool = self._get_pool()
+            futures = [
+                (zim_file, pool.submit(self._search_single_zim, zim_file, clean_query, count, start_offset))
+                for zim_file, (start_offset, count) in windows.items()
+            ]
+        except RuntimeError as e:
+            # Pool shut down underneath us; fall back to searching inline
+            self.logger.warning("Parallel search unavailable, searching sequentially: %s", e)
+            return self._search_sequential(windows, clean_query)
+        
+        # One deadline for the whole fan-out, not one timeout per file
+        deadline = time.monotonic() + self.config.search_timeout
+        per_file = {}
+        for zim_file, future in futures:
+            try:
+                per_file[zim_file] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                self.logger.warning("Search in %s timed out after %ds", zim_file, self.config.search_timeout)
+        return per_file
+    
     def search_all_zim_files(self, query: str, max_results: int = 20, 
                             start_offset: int = 0) -> List[SearchEngineResult]:
         """Search across all available ZIM files"""
@@ -194,10 +573,9 @@ class SearchEngine:
             if searcher is None:
                 return 0
             
-            search_query = libzim.search.Query().set_query(clean_query)
-            search = searcher.search(search_query)
+            search = self._get_search(zim_file, searcher, clean_query)
             
-            return search.getEstimatedMatches()
+            return search.estimated_matches()
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error getting estimated matches for %s: %s", zim_file, e)
@@ -205,65 +583,148 @@ class SearchEngine:
     
     def browse_entries_by_pattern(self, zim_file: str, path_pattern: Optional[str] = None,
                                  title_pattern: Optional[str] = None, limit: int = 50) -> List[SearchEngineResult]:
-        """Browse entries by path or title patterns"""
+        """Browse entries whose path and title contain the given patterns, ignoring case"""
         try:
             archive = self.zim_manager.get_archive(zim_file)
             if archive is None:
                 return []
             
-            results = []
-            count = 0
+            path_matches = _compile_substring(path_pattern) if path_pattern else None
+            title_matches = _compile_substring(title_pattern) if title_pattern else None
             
-            # This is a simplified implementation
-            # In a real implementation, you'd want to iterate through entries more efficiently
+            if path_pattern or title_pattern:
+                sources = self._browse_candidates(archive, path_pattern, title_pattern, limit)
+            else:
+                # Without a pattern, browsing is a random sample of the archive
+                sources = [self._iter_random_entries(archive, limit * 5)]
             
-            # For now, get some random entries and filter
-            for _ in range(limit * 5):  # Try more entries to find matches
-                if count >= limit:
-                    break
-                
-                try:
-                    entry = archive.get_random_entry()
-                    if entry:
-                        match = True
-                        
-                        if path_pattern and path_pattern.lower() not in entry.path.lower():
-                            match = False
-                        
-                        if title_pattern and title_pattern.lower() not in entry.title.lower():
-                            match = False
-                        
-                        if match:
-                            result = SearchEngineResult(
-                                zim_file=zim_file,
-                                path=entry.path,
-                                title=entry.title,
-                                is_redirect=entry.is_redirect
-                            )
-                            results.append(result)
-                            count += 1
-                            
-                except (KeyError, ValueError, RuntimeError) as e:
-                    self.logger.warning("Error browsing entry: %s", e)
+            results = []
+            seen = set()
+            for entry in chain.from_iterable(sources):
+                if entry.path in seen:
                     continue
-            
+                if path_matches and not path_matches(entry.path):
+                    continue
+                if title_matches and not title_matches(entry.title):
+                    continue
+                seen.add(entry.path)
+                results.append(SearchEngineResult(
+                    zim_file=zim_file,
+                    path=entry.path,
+                    title=entry.title,
+                    is_redirect=entry.is_redirect
+                ))
+                if len(results) >= limit:
+                    break
             return results
             
         except (OSError, ValueError, RuntimeError) as e:
             self.logger.error("Error browsing entries in %s: %s", zim_file, e)
             return []
     
+    def _browse_candidates(self, archive: Any, path_pattern: Optional[str], title_pattern: Optional[str],
+                           limit: int) -> List[Iterator[Any]]:
+        """Get the entry sources a pattern browse draws candidates from, in order"""
+        # Indexed candidates first; they only narrow the search, every
+        # entry returned still has to pass both substring filters
+        sources = []
+        # Archive._get_entry_by_id (id order is path order) is private to
+        # python-libzim, which is pinned below 4 for it; the walks are
+        # skipped if a release drops it
+        can_walk = hasattr(archive, "_get_entry_by_id")
+        if path_pattern and can_walk:
+            # Entries are stored sorted by path
+            sources.append(self._iter_entries_with_prefix(archive, path_pattern))
+        if title_pattern and archive.has_title_index:
+            # Word prefixes in the title index
+            sources.append(self._iter_suggested_entries(archive, title_pattern, limit * 5))
+        
+        # Then the substring filter proper: over the entries in path order,
+        # up to the scan limit, which covers every entry of a small
+        # archive, and over a random sample after that
+        if can_walk:
+            sources.append(islice(self._iter_all_entries(archive), _BROWSE_SCAN_LIMIT))
+        if not can_walk or archive.entry_count > _BROWSE_SCAN_LIMIT:
+            sources.append(self._iter_random_entries(archive, limit * 5))
+        return sources
+    
+    def _iter_suggested_entries(self, archive: Any, title_pattern: str, max_candidates: int) -> Iterator[Any]:
+        """Yield entries whose titles match a pattern in the title index"""
+        suggestion = libzim.suggestion.SuggestionSearcher(archive).suggest(title_pattern)
+        for path in suggestion.getResults(0, max_candidates):
+            try:
+                yield archive.get_entry_by_path(path)
+            except KeyError as e:
+                self.logger.warning("Error browsing entry: %s", e)
+    
+    def _iter_entries_with_prefix(self, archive: Any, prefix: str) -> Iterator[Any]:
+        """Yield entries whose paths start with a prefix, in path order"""
+        get_entry = archive._get_entry_by_id
+        entry_count = archive.entry_count
+        
+        # Binary search the path-ordered entry table for the first candidate
+        first = bisect_left(range(entry_count), prefix, key=lambda i: get_entry(i).path)
+        for entry_id in range(first, entry_count):
+            entry = get_entry(entry_id)
+            if not entry.path.startswith(prefix):
+                break
+            yield entry
+    
+    def _iter_all_entries(self, archive: Any) -> Iterator[Any]:
+        """Yield every entry, in path order"""
+        get_entry = archive._get_entry_by_id
+        for entry_id in range(archive.entry_count):
+            yield get_entry(entry_id)
+    
+    def _iter_random_entries(self, archive: Any, attempts: int) -> Iterator[Any]:
+        """Yield random entries"""
+        for _ in range(attempts):
+            try:
+                yield archive.get_random_entry()
+            except (KeyError, ValueError, RuntimeError) as e:
+                self.logger.warning("Error browsing entry: %s", e)
+                continue
+    
+    def _forget_file(self, filename: Optional[str]) -> None:
+        """Drop the results and searchers of a removed or replaced ZIM file, or of all files for None"""
+        if filename is None:
+            self.search_cache.clear()
+            self.searcher_cache.clear()
+            self._search_cache.clear()
+            return
+        for key, _ in self.search_cache.items():
+            # Single-file results are keyed by filename, merged ones by a tuple of them
+            zim_files = key[0] if isinstance(key[0], tuple) else (key[0],)
+            if any(Path(zim_file).name == filename for zim_file in zim_files):
+                self.search_cache.pop(key)
+        for key, _ in self.searcher_cache.items():
+            if Path(key).name == filename:
+                self.searcher_cache.pop(key)
+        for key, _ in self._search_cache.items():
+            if Path(key[0]).name == filename:
+                self._search_cache.pop(key)
+    
     def clear_caches(self) -> None:
         """Clear all search caches"""
         self.search_cache.clear()
+        self._search_cache.clear()
+        self._query_cache.clear()
         self.searcher_cache.clear()
         self.logger.info("Cleared search caches")
     
+    def close(self) -> None:
+        """Shut down the search worker pool"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+    
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get search cache statistics"""
         return {
             "search_cache_size": self.search_cache.size(),
             "search_cache_max_size": self.config.search_cache_size,
-            "searcher_cache_size": len(self.searcher_cache)
+            "searcher_cache_size": self.searcher_cache.size(),
+            "searcher_cache_max_size": self.config.searcher_cache_size
         }
 
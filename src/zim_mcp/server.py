@@ -4,16 +4,20 @@ MCP ZIM Server - Main server implementation
 Author: mobilemutex
 """
 
-from typing import List, Optional
-import json
+from functools import wraps
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+import asyncio
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from mcp.server.fastmcp import FastMCP
+from pydantic import TypeAdapter
 from .config import load_config
 from .zim_manager import ZimManager
 from .search_engine import SearchEngine
 from .content_extractor import ContentExtractor
 from .file_discovery import FileDiscovery
-from .utils import setup_logging, clean_html_content
+from .utils import LRUCache, TTLCache, setup_logging, clean_html_content, decode_bounded, drop_partial_tag
 from .models import (
     ZimFileInfo, ZimMetadata, CacheInfo, ZimFileMetadataResponse,
     ZimEntryContent, ZimEntryResponse, SearchResult, SearchPagination,
@@ -40,11 +44,83 @@ content_extractor = ContentExtractor(config, zim_manager)
 # Initialize file discovery
 file_discovery = FileDiscovery(config)
 
+# Blocking tool bodies run in worker threads; this bounds how many at once
+_tool_slots = asyncio.Semaphore(config.max_concurrent_tool_calls)
+
+T = TypeVar("T")
+
+
+def _run_in_thread(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Expose a blocking tool as a coroutine that runs it in a worker thread"""
+    @wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        async with _tool_slots:
+            return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
+
+# Final read_zim_entry contents, keyed by the file's (mtime, size) fingerprint
+# among others. Entries are immutable within a ZIM file; the models are
+# frozen, so sharing is safe.
+_ENTRY_CONTENT_CACHE = LRUCache(config.entry_content_cache_size)
+
+
+def _forget_entry_contents(filename: Optional[str]) -> None:
+    """Drop cached entry contents of a removed or replaced ZIM file, or of all files for None"""
+    if filename is None:
+        _ENTRY_CONTENT_CACHE.clear()
+        return
+    for key, _ in _ENTRY_CONTENT_CACHE.items():
+        if Path(key[0]).name == filename:
+            _ENTRY_CONTENT_CACHE.pop(key)
+
+
+zim_manager.add_invalidation_listener(_forget_entry_contents)
+
+# Error responses that carry no request data, built once. The values are
+# literal defaults, so validation is skipped; the models are frozen.
+_EMPTY_METADATA_ERROR = ZimFileMetadataResponse.model_construct(
+    status="error",
+    metadata=ZimMetadata.model_construct(
+        filename="",
+        title="",
+        description="",
+        size=0,
+        size_formatted="",
+        article_count=0,
+        media_count=0,
+        language="",
+        creator="",
+        date="",
+        has_fulltext_index=False,
+        has_title_index=False,
+        uuid=""
+    ),
+    cache_info=CacheInfo.model_construct(is_cached=False)
+)
+_EMPTY_ENTRY_ERROR = ZimEntryResponse.model_construct(
+    status="error",
+    entry=ZimEntryContent.model_construct(
+        path="",
+        title="",
+        content="",
+        content_length=0,
+        format="",
+        is_redirect=False
+    )
+)
+_EMPTY_LIST_ERROR = ListZimFilesResponse.model_construct(status="error", count=0, files=[])
+_EMPTY_RANDOM_ERROR = RandomEntriesResponse.model_construct(status="error", count=0, entries=[])
+
+# The last discovery result list_zim_files formatted, with its models
+_file_list_models: Optional[Tuple[tuple, List[ZimFileInfo]]] = None
+
 # Create MCP server
 mcp = FastMCP("ZIM Server")
 
 
 @mcp.tool()
+@_run_in_thread
 def list_zim_files() -> ListZimFilesResponse:
     """
     List all available ZIM files in the configured directory.
@@ -58,22 +134,30 @@ def list_zim_files() -> ListZimFilesResponse:
         # Discover ZIM files
         zim_files = zim_manager.discover_zim_files()
 
-        # Format response
-        files_data = []
-        for file_info in zim_files:
-            files_data.append(ZimFileInfo(
-                filename=file_info.filename,
-                title=file_info.title,
-                description=file_info.description,
-                size=file_info.size_formatted,
-                article_count=file_info.article_count,
-                media_count=file_info.media_count,
-                language=file_info.language,
-                creator=file_info.creator,
-                date=file_info.date,
-                has_fulltext_index=file_info.has_fulltext_index,
-                has_title_index=file_info.has_title_index
-            ))
+        # File info is read eagerly at discovery, so formatting does no I/O;
+        # reuse the models for as long as discovery returns the same scan
+        global _file_list_models
+        cached_models = _file_list_models
+        if cached_models is not None and cached_models[0] is zim_files:
+            files_data = cached_models[1]
+        else:
+            # Format response
+            files_data = []
+            for file_info in zim_files:
+                files_data.append(ZimFileInfo(
+                    filename=file_info.filename,
+                    title=file_info.title,
+                    description=file_info.description,
+                    size=file_info.size_formatted,
+                    article_count=file_info.article_count,
+                    media_count=file_info.media_count,
+                    language=file_info.language,
+                    creator=file_info.creator,
+                    date=file_info.date,
+                    has_fulltext_index=file_info.has_fulltext_index,
+                    has_title_index=file_info.has_title_index
+                ))
+            _file_list_models = (zim_files, files_data)
 
         return ListZimFilesResponse(
             status="success",
@@ -83,14 +167,11 @@ def list_zim_files() -> ListZimFilesResponse:
 
     except (RuntimeError, OSError, ValueError) as e:
         logger.error("Error listing ZIM files: %s", e)
-        return ListZimFilesResponse(
-            status="error",
-            count=0,
-            files=[]
-        )
+        return _EMPTY_LIST_ERROR
 
 
 @mcp.tool()
+@_run_in_thread
 def get_zim_metadata(zim_file: str) -> ZimFileMetadataResponse:
     """
     Get detailed metadata about a specific ZIM file.
@@ -108,25 +189,7 @@ def get_zim_metadata(zim_file: str) -> ZimFileMetadataResponse:
         file_info = zim_manager.get_zim_file_info(zim_file)
 
         if file_info is None:
-            return ZimFileMetadataResponse(
-                status="error",
-                metadata=ZimMetadata(
-                    filename="",
-                    title="",
-                    description="",
-                    size=0,
-                    size_formatted="",
-                    article_count=0,
-                    media_count=0,
-                    language="",
-                    creator="",
-                    date="",
-                    has_fulltext_index=False,
-                    has_title_index=False,
-                    uuid=""
-                ),
-                cache_info=CacheInfo(is_cached=False)
-            )
+            return _EMPTY_METADATA_ERROR
 
         return ZimFileMetadataResponse(
             status="success",
@@ -152,28 +215,11 @@ def get_zim_metadata(zim_file: str) -> ZimFileMetadataResponse:
 
     except (ValueError, RuntimeError, OSError) as e:
         logger.error("Error getting ZIM metadata for %s: %s", zim_file, e)
-        return ZimFileMetadataResponse(
-            status="error",
-            metadata=ZimMetadata(
-                filename="",
-                title="",
-                description="",
-                size=0,
-                size_formatted="",
-                article_count=0,
-                media_count=0,
-                language="",
-                creator="",
-                date="",
-                has_fulltext_index=False,
-                has_title_index=False,
-                uuid=""
-            ),
-            cache_info=CacheInfo(is_cached=False)
-        )
+        return _EMPTY_METADATA_ERROR
 
 
 @mcp.tool()
+@_run_in_thread
 def read_zim_entry(zim_file: str, entry_path: str, output_format: str = "text") -> ZimEntryResponse:
     """
     Read specific entry content from a ZIM file.
@@ -191,88 +237,81 @@ def read_zim_entry(zim_file: str, entry_path: str, output_format: str = "text")
 
         # Validate format
         if output_format not in ["text", "html", "raw"]:
-            return ZimEntryResponse(
-                status="error",
-                entry=ZimEntryContent(
-                    path="",
-                    title="",
-                    content="",
-                    content_length=0,
-                    format="",
-                    is_redirect=False
-                )
-            )
+            return _EMPTY_ENTRY_ERROR
+
+        # One stat, so a cached read never outlives the file it came from
+        fingerprint = zim_manager.get_file_fingerprint(zim_file)
+        if fingerprint is None:
+            return _EMPTY_ENTRY_ERROR
+
+        # Serve a recent read of the same entry as-is
+        cache_key = (zim_file, entry_path, output_format, config.max_content_length, fingerprint)
+        cached_entry = _ENTRY_CONTENT_CACHE.get(cache_key)
+        if cached_entry is not None:
+            return ZimEntryResponse(status="success", entry=cached_entry)
 
         # Get entry
         entry = zim_manager.get_entry_by_path(zim_file, entry_path)
 
         if entry is None:
-            return ZimEntryResponse(
-                status="error",
-                entry=ZimEntryContent(
-                    path="",
-                    title="",
-                    content="",
-                    content_length=0,
-                    format="",
-                    is_redirect=False
-                )
-            )
+            return _EMPTY_ENTRY_ERROR
 
         # Get content
         item = entry.get_item()
-        content_bytes = bytes(item.content)
+        content_buffer = item.content
+        content_length = len(content_buffer)
+        limit = config.max_content_length
 
         # Convert content based on format
         if output_format == "raw":
-            # Return raw bytes as hex
-            content = content_bytes.hex()
+            # Return raw bytes as hex, encoding only the bytes that survive
+            # truncation (plus one, so longer content is still marked)
+            content = memoryview(content_buffer)[:limit // 2 + 1].hex()
         else:
-            # Decode as text
-            try:
-                content = content_bytes.decode('utf-8')
-            except UnicodeDecodeError:
-                try:
-                    content = content_bytes.decode('latin-1')
-                except UnicodeDecodeError:
-                    content = str(content_bytes)
-
-            # Clean HTML if text format requested
-            if output_format == "text" and content:
-                content = clean_html_content(content)
+            # Decode only as much as the response can hold. A UTF-8 character
+            # is at most 4 bytes; text output grows the window until tag
+            # removal still leaves more than `limit` characters, and stops
+            # once the window covers the whole blob.
+            window = min(max(limit, 1) * 4, content_length)
+            while True:
+                content, complete = decode_bounded(content_buffer, window)
+
+                # Clean HTML if text format requested
+                if output_format == "text" and content:
+                    if not complete:
+                        content = drop_partial_tag(content)
+                    content = clean_html_content(content)
+
+                if complete or len(content) > limit:
+                    break
+                window = min(window * 4, content_length)
 
         # Truncate if too long
-        if len(content) > config.max_content_length:
-            content = content[:config.max_content_length] + "... [truncated]"
+        if len(content) > limit:
+            content = content[:limit] + "... [truncated]"
+
+        entry_content = ZimEntryContent(
+            path=entry.path,
+            title=entry.title,
+            content=content,
+            content_length=content_length,
+            format=output_format,
+            is_redirect=entry.is_redirect
+        )
+        _ENTRY_CONTENT_CACHE.put(cache_key, entry_content)
 
         return ZimEntryResponse(
             status="success",
-            entry=ZimEntryContent(
-                path=entry.path,
-                title=entry.title,
-                content=content,
-                content_length=len(content_bytes),
-                format=output_format,
-                is_redirect=entry.is_redirect
-            )
+            entry=entry_content
         )
 
     except (ValueError, RuntimeError, OSError, UnicodeDecodeError) as e:
         logger.error("Error reading entry %s from %s: %s", entry_path, zim_file, e)
-        return ZimEntryResponse(
-            status="error",
-            entry=ZimEntryContent(
-                path="",
-                title="",
-                content="",
-                content_length=0,
-                format="",
-                is_redirect=False
-            )
-        )
+        return _EMPTY_ENTRY_ERROR
 
 
 @mcp.tool()
+@_run_in_thread
 def search_zim_files(query: str, zim_files: Optional[List[str]] = None,
                     max_results: int = 20, start_offset: int = 0) -> SearchResponse:
     """
@@ -365,6 +404,7 @@ def search_zim_files(query: str, zim_files: Optional[List[str]] = None,
 
 
 @mcp.tool()
+@_run_in_thread
 def search_and_extract_content(query: str, zim_files: Optional[List[str]] = None,
                               max_results: int = 10, content_format: str = "text",
                               max_content_length: Optional[int] = None) -> SearchAndExtractResponse:
@@ -409,9 +449,10 @@ def search_and_extract_content(query: str, zim_files: Optional[List[str]] = None
         else:
             search_results = search_engine.search_all_zim_files(query, max_results, 0)
 
-        # Extract content for each result
+        # Extract content for each result; short limits only need the head of each entry
+        preview_length = max_content_length if max_content_length and max_content_length < 500 else None
         extracted_contents = content_extractor.extract_search_results_content(
-            search_results, content_format
+            search_results, content_format, preview_length
         )
 
         # Format results
@@ -453,6 +494,7 @@ def search_and_extract_content(query: str, zim_files: Optional[List[str]] = None
 
 
 @mcp.tool()
+@_run_in_thread
 def browse_zim_entries(zim_file: str, path_pattern: Optional[str] = None,
                       title_pattern: Optional[str] = None, limit: int = 50) -> BrowseResponse:
     """
@@ -460,8 +502,8 @@ def browse_zim_entries(zim_file: str, path_pattern: Optional[str] = None,
 
     Args:
         zim_file: ZIM file to browse
-        path_pattern: Optional path pattern to match
-        title_pattern: Optional title pattern to match
+        path_pattern: Optional path prefix to match
+        title_pattern: Optional title pattern to match (uses the title index when available)
         limit: Maximum entries to return
 
     Returns:
@@ -528,6 +570,7 @@ def browse_zim_entries(zim_file: str, path_pattern: Optional[str] = None,
 
 
 @mcp.tool()
+@_run_in_thread
 def get_random_entries(zim_files: Optional[List[str]] = None, count: int = 5) -> RandomEntriesResponse:
     """
     Get random entries from ZIM files for exploration.
@@ -544,44 +587,29 @@ def get_random_entries(zim_files: Optional[List[str]] = None, count: int = 5) ->
 
         # Validate count
         if count <= 0 or count > 50:
-            return RandomEntriesResponse(
-                status="error",
-                count=0,
-                entries=[]
-            )
+            return _EMPTY_RANDOM_ERROR
 
         # Get available files if none specified
         if zim_files is None:
-            available_files = zim_manager.discover_zim_files()
-            zim_files = [f.filename for f in available_files]
+            zim_files = zim_manager.list_filenames()
 
         if not zim_files:
-            return RandomEntriesResponse(
-                status="error",
-                count=0,
-                entries=[]
-            )
-
-        random_entries = []
-        entries_per_file = max(1, count // len(zim_files))
-
-        for zim_file in zim_files:
-            try:
-                for _ in range(entries_per_file):
-                    if len(random_entries) >= count:
-                        break
-
-                    entry = zim_manager.get_random_entry(zim_file)
-                    if entry:
-                        random_entries.append(RandomEntry(
-                            zim_file=zim_file,
-                            path=entry.path,
-                            title=entry.title,
-                            is_redirect=entry.is_redirect
-                        ))
-            except (FileNotFoundError, RuntimeError, ValueError, OSError) as e:
-                logger.warning("Error getting random entry from %s: %s", zim_file, e)
-                continue
+            return _EMPTY_RANDOM_ERROR
+
+        # Spread the requested slots round-robin over the files
+        slots = [zim_files[i % len(zim_files)] for i in range(count)]
+
+        if config.enable_parallel_search and count > 1:
+            # libzim releases the GIL, so slots from different files overlap
+            random_entries = []
+            with ThreadPoolExecutor(max_workers=min(8, count)) as pool:
+                futures = [pool.submit(_random_entry_from, zim_file) for zim_file in slots]
+                for future in as_completed(futures):
+                    random_entry = future.result()
+                    if random_entry is not None:
+                        random_entries.append(random_entry)
+        else:
+            random_entries = [entry for entry in map(_random_entry_from, slots) if entry is not None]
 
         return RandomEntriesResponse(
             status="success",
@@ -591,21 +619,46 @@ def get_random_entries(zim_files: Optional[List[str]] = None, count: int = 5) ->
 
     except (ValueError, RuntimeError, OSError) as e:
         logger.error("Error getting random entries: %s", e)
-        return RandomEntriesResponse(
-            status="error",
-            count=0,
-            entries=[]
-        )
+        return _EMPTY_RANDOM_ERROR
+
+
+def _random_entry_from(zim_file: str) -> Optional[RandomEntry]:
+    """Draw one random entry from a ZIM file, or None if that fails"""
+    try:
+        entry = zim_manager.get_random_entry(zim_file)
+        if entry:
+            return RandomEntry(
+                zim_file=zim_file,
+                path=entry.path,
+                title=entry.title,
+                is_redirect=entry.is_redirect
+            )
+    except (FileNotFoundError, RuntimeError, ValueError, OSError) as e:
+        logger.warning("Error getting random entry from %s: %s", zim_file, e)
+    return None
+
+
+# Serializes file lists straight from the models, without intermediate dicts
+_ZIM_FILE_LIST = TypeAdapter(List[ZimFileInfo])
+
+# Serialized resource bodies by URI; only successful responses are cached
+_resource_cache = TTLCache(32, config.resource_cache_ttl)
 
 
 # Resource endpoints
 @mcp.resource("zim://files")
-def list_zim_files_resource() -> str:
+async def list_zim_files_resource() -> str:
     """Provide list of available ZIM files as a resource"""
+    cached = _resource_cache.get("zim://files")
+    if cached is not None:
+        return cached
+
     try:
-        result = list_zim_files()
+        result = await list_zim_files()
         if result.status == "success":
-            return json.dumps(result.files, indent=2)
+            body = _ZIM_FILE_LIST.dump_json(result.files, indent=2).decode()
+            _resource_cache.put("zim://files", body)
+            return body
         else:
             return f"Error: {result}"
     except (ValueError, RuntimeError, OSError, TypeError) as e:
@@ -613,12 +666,19 @@ def list_zim_files_resource() -> str:
 
 
 @mcp.resource("zim://file/{filename}/metadata")
-def get_zim_metadata_resource(filename: str) -> str:
+async def get_zim_metadata_resource(filename: str) -> str:
     """Provide ZIM file metadata as a resource"""
+    uri = f"zim://file/{filename}/metadata"
+    cached = _resource_cache.get(uri)
+    if cached is not None:
+        return cached
+
     try:
-        result = get_zim_metadata(filename)
+        result = await get_zim_metadata(filename)
         if result.status == "success":
-            return json.dumps(result.metadata, indent=2)
+            body = result.metadata.model_dump_json(indent=2)
+            _resource_cache.put(uri, body)
+            return body
         else:
             return f"Error: {result}"
     except (ValueError, RuntimeError, OSError, TypeError) as e:
@@ -626,10 +686,10 @@ def get_zim_metadata_resource(filename: str) -> str:
 
 
 @mcp.resource("zim://file/{filename}/entry/{path}")
-def read_zim_entry_resource(filename: str, path: str) -> str:
+async def read_zim_entry_resource(filename: str, path: str) -> str:
     """Provide specific entry content as a resource"""
     try:
-        result = read_zim_entry(filename, path, output_format="text")
+        result = await read_zim_entry(filename, path, output_format="text")
         if result.status == "success":
             return result.entry.content
         else:
@@ -638,23 +698,37 @@ def read_zim_entry_resource(filename: str, path: str) -> str:
         return f"Error: {str(e)}"
 
 
+def _install_uvloop() -> None:
+    """Use uvloop for the event loop when it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        return
+    uvloop.install()
+    logger.info("Using uvloop event loop")
+
+
 def main():
     """Main entry point for the server"""
     parser = argparse.ArgumentParser(description="MCP ZIM Server")
     parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio",
                        help="Transport type (default: stdio)")
     parser.add_argument("--port", type=int, default=8000,
-                       help="Port for SSE transport (default: 8000)")
+                       help="Port for HTTP/SSE transports (default: 8000)")
 
     args = parser.parse_args()
 
     logger.info("Starting MCP ZIM Server with %s transport", args.transport)
     logger.info("ZIM files directory: %s", config.zim_files_directory)
 
-    # Discover ZIM files on startup
-    zim_files = zim_manager.discover_zim_files()
+    # Discover ZIM files on startup, never trusting an earlier scan
+    zim_files = zim_manager.discover_zim_files(force_refresh=True)
     logger.info("Found %d ZIM files", len(zim_files))
 
+    # FastMCP runs every transport under asyncio, which picks up the uvloop policy
+    _install_uvloop()
+    mcp.settings.port = args.port
+
     if args.transport == "stdio":
         mcp.run(transport="stdio")
     elif args.transport == "streamable-http":
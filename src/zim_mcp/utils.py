@@ -5,14 +5,27 @@ Author: mobilemutex
 """
 
 import logging
+import threading
 import time
-from functools import wraps
+import weakref
+from collections import OrderedDict
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Union
-import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import re
 
 
+# Compiled once at import; called per entry and per preview
+_HTML_TAG_RE = re.compile(r'<[^<>]+>')
+_SANITIZE_RE = re.compile(r'[^\w\-_\.]')
+# Same substitution as _SANITIZE_RE for ASCII input
+_SANITIZE_TABLE = {c: '_' for c in range(128) if not (chr(c).isalnum() or chr(c) in '-_.')}
+
+# File size units and their divisors (1024 ** i)
+_SIZE_NAMES = ("B", "KB", "MB", "GB", "TB")
+_UNIT_DIVISORS = tuple(1 << (i * 10) for i in range(len(_SIZE_NAMES)))
+
+
 def setup_logging(level: str = "INFO") -> logging.Logger:
     """Set up logging configuration"""
     logging.basicConfig(
@@ -24,14 +37,23 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
 
 
 def timing_decorator(func: Callable) -> Callable:
-    """Decorator to measure function execution time"""
+    """Decorator to measure function execution time
+    
+    Timing is skipped unless DEBUG logging is enabled. The level is checked
+    per call (isEnabledFor is cached by logging) because logging is
+    configured after the decorated modules are imported.
+    """
+    logger = logging.getLogger("mcp_zim_server")
+    
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
+        if not logger.isEnabledFor(logging.DEBUG):
+            return func(*args, **kwargs)
+        
+        start_ns = time.perf_counter_ns()
         result = func(*args, **kwargs)
-        end_time = time.time()
-        logger = logging.getLogger("mcp_zim_server")
-        logger.debug("%s took %.3f seconds", func.__name__, end_time - start_time)
+        elapsed_ns = time.perf_counter_ns() - start_ns
+        logger.debug("%s took %.3f seconds", func.__name__, elapsed_ns / 1e9)
         return result
     return wrapper
 
@@ -39,7 +61,11 @@ def timing_decorator(func: Callable) -> Callable:
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to prevent path traversal attacks"""
     # Remove any path separators and dangerous characters
-    sanitized = re.sub(r'[^\w\-_\.]', '_', filename)
+    if filename.isascii():
+        # Character-class substitution done in C via a translate table
+        sanitized = filename.translate(_SANITIZE_TABLE)
+    else:
+        sanitized = _SANITIZE_RE.sub('_', filename)
     # Remove leading dots to prevent hidden files
     sanitized = sanitized.lstrip('.')
     return sanitized
@@ -71,13 +97,23 @@ def format_file_size(size_bytes: int) -> str:
     if size_bytes == 0:
         return "0 B"
     
-    size_names = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while size_bytes >= 1024 and i < len(size_names) - 1:
-        size_bytes /= 1024.0
-        i += 1
+    # Unit index straight from the bit length: each unit is 10 bits
+    i = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_NAMES) - 1)
+    if i < 0:
+        i = 0
     
-    return f"{size_bytes:.1f} {size_names[i]}"
+    return f"{size_bytes / _UNIT_DIVISORS[i]:.1f} {_SIZE_NAMES[i]}"
+
+
+def format_timestamp(timestamp: float) -> str:
+    """Format a POSIX timestamp as local time, to the second"""
+    return _format_epoch_seconds(int(timestamp))
+
+
+@lru_cache(maxsize=4096)
+def _format_epoch_seconds(seconds: int) -> str:
+    """Cached strftime for whole seconds; bulk-copied files often share mtimes"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(seconds))
 
 
 def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
@@ -90,17 +126,63 @@ def truncate_text(text: str, max_length: int, suffix: str = "...") -> str:
 
 def clean_html_content(html_content: str) -> str:
     """Basic HTML tag removal for text extraction"""
-    # Remove HTML tags using regex (basic implementation)
-    clean_text = re.sub(r'<[^>]+>', '', html_content)
-    # Clean up extra whitespace
-    clean_text = re.sub(r'\s+', ' ', clean_text).strip()
-    return clean_text
+    # Remove HTML tags using regex (basic implementation). Excluding '<' from
+    # the tag body keeps this linear on unbalanced input such as '<<<<...'.
+    # Content without '<' has no tags, so the regex pass is skipped.
+    clean_text = _HTML_TAG_RE.sub('', html_content) if '<' in html_content else html_content
+    
+    # Already-normalized text: printable means plain spaces are the only
+    # whitespace, so with no runs and no padding there is nothing to collapse
+    if (clean_text.isprintable() and '  ' not in clean_text
+            and not clean_text.startswith(' ') and not clean_text.endswith(' ')):
+        return clean_text
+    
+    # Clean up extra whitespace; split/join avoids a second regex pass
+    return ' '.join(clean_text.split())
+
+
+def decode_bounded(blob: Any, limit: int) -> Tuple[str, bool]:
+    """Decode at most the first ``limit`` bytes of a buffer as UTF-8
+    
+    Only the slice is copied out of the buffer. Returns the text and
+    whether it covers the whole buffer; a character split by the cut
+    decodes to U+FFFD.
+    """
+    view = memoryview(blob)
+    complete = len(view) <= limit
+    return str(view if complete else view[:limit], 'utf-8', 'replace'), complete
+
+
+def drop_partial_tag(text: str) -> str:
+    """Drop a trailing tag left unterminated by cutting HTML short"""
+    cut = text.rfind('<')
+    if cut > text.rfind('>'):
+        return text[:cut]
+    return text
+
+
+def generate_cache_key(*args) -> Tuple[Any, ...]:
+    """Generate a cache key from arguments
+    
+    Hashable arguments are used as they are, with no string or digest
+    built; lists become tuples and anything else unhashable its repr().
+    """
+    try:
+        hash(args)
+        return args
+    except TypeError:
+        return tuple(_key_part(arg) for arg in args)
 
 
-def generate_cache_key(*args) -> str:
-    """Generate a cache key from arguments"""
-    key_string = "|".join(str(arg) for arg in args)
-    return hashlib.md5(key_string.encode()).hexdigest()
+def _key_part(arg: Any) -> Any:
+    """Make one cache key argument hashable"""
+    if isinstance(arg, list):
+        arg = tuple(arg)
+    try:
+        hash(arg)
+        return arg
+    except TypeError:
+        return repr(arg)
 
 
 def safe_get_dict_value(dictionary: Dict[str, Any], key: str, default: Any = None) -> Any:
@@ -109,47 +191,294 @@ def safe_get_dict_value(dictionary: Dict[str, Any], key: str, default: Any = Non
 
 
 class LRUCache:
-    """Simple LRU cache implementation"""
+    """Thread-safe LRU cache implementation
+    
+    max_size bounds the number of entries, or, when getsizeof is given,
+    the total of getsizeof(value) over all cached values. on_evict, if
+    given, is called with (key, value) for entries pushed out to make room.
+    """
     
-    def __init__(self, max_size: int):
+    def __init__(self, max_size: int, getsizeof: Optional[Callable[[Any], int]] = None,
+                 on_evict: Optional[Callable[[Any, Any], None]] = None):
         self.max_size = max_size
-        self.cache: Dict[str, Any] = {}
-        self.access_order: List[str] = []
+        self.getsizeof = getsizeof
+        self.on_evict = on_evict
+        # Ordered from least to most recently used
+        self.cache: OrderedDict = OrderedDict()
+        self.weights: Dict[Any, int] = {}
+        self.current_size = 0
+        self._lock = threading.RLock()
     
-    def get(self, key: str) -> Optional[Any]:
+    def __contains__(self, key: Any) -> bool:
+        return key in self.cache
+    
+    def get(self, key: Any) -> Optional[Any]:
         """Get value from cache"""
-        if key in self.cache:
-            # Move to end (most recently used)
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            return self.cache[key]
-        return None
-    
-    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            if key in self.cache:
+                # Move to end (most recently used)
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            return None
+    
+    def put(self, key: Any, value: Any) -> None:
         """Put value in cache"""
-        if key in self.cache:
-            # Update existing
-            self.cache[key] = value
-            self.access_order.remove(key)
-            self.access_order.append(key)
-        else:
-            # Add new
-            if len(self.cache) >= self.max_size:
-                # Remove least recently used
-                oldest_key = self.access_order.pop(0)
-                del self.cache[oldest_key]
+        weight = self.getsizeof(value) if self.getsizeof else 1
+        
+        with self._lock:
+            if key in self.cache:
+                # Replace existing
+                self._remove(key)
+            
+            if weight > self.max_size:
+                # Would not fit even in an empty cache
+                return
+            
+            # Remove least recently used until the new value fits
+            while self.current_size + weight > self.max_size:
+                victim, evicted = self.cache.popitem(last=False)
+                self.current_size -= self.weights.pop(victim)
+                if self.on_evict:
+                    self.on_evict(victim, evicted)
             
             self.cache[key] = value
-            self.access_order.append(key)
+            self.weights[key] = weight
+            self.current_size += weight
+    
+    def _remove(self, key: Any) -> None:
+        """Remove an entry and release its weight"""
+        del self.cache[key]
+        self.current_size -= self.weights.pop(key)
+    
+    def pop(self, key: Any) -> Optional[Any]:
+        """Remove an entry, returning its value if it was cached"""
+        with self._lock:
+            value = self.cache.get(key)
+            if key in self.cache:
+                self._remove(key)
+            return value
+    
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Snapshot of the cached (key, value) pairs, least recently used first"""
+        with self._lock:
+            return list(self.cache.items())
     
     def clear(self) -> None:
         """Clear cache"""
-        self.cache.clear()
-        self.access_order.clear()
+        with self._lock:
+            self.cache.clear()
+            self.weights.clear()
+            self.current_size = 0
     
     def size(self) -> int:
         """Get current cache size"""
         return len(self.cache)
+    
+    def admission_size(self) -> int:
+        """Number of new entries the cache can take without evicting one of them"""
+        return self.max_size
+
+
+class TinyLFUCache(LRUCache):
+    """LRU cache with a TinyLFU admission filter
+    
+    Key frequencies are tracked in a count-min sketch. When the cache is
+    full, a new key is only admitted if it has been seen at least as often
+    as the entry it would evict, so one-off scans (e.g. paging through an
+    unpopular query) cannot flush out frequently used entries.
+    """
+    
+    _MAX_COUNT = 15
+    # Odd 64-bit multipliers, one per sketch row
+    _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+    
+    def __init__(self, max_size: int, getsizeof: Optional[Callable[[Any], int]] = None,
+                 on_evict: Optional[Callable[[Any, Any], None]] = None):
+        super().__init__(max_size, getsizeof, on_evict)
+        bits = max(4, (4 * max_size - 1).bit_length())
+        width = 1 << bits
+        self._shift = 64 - bits
+        self._sketch = [bytearray(width) for _ in self._SEEDS]
+        # Halve all counters after this many increments so old popularity fades
+        self._sample_size = max(width, 10 * max_size)
+        self._additions = 0
+    
+    def _indexes(self, key: Any) -> List[int]:
+        """Get the sketch column of a key in each row"""
+        # Multiplicative hashing: take the top bits of hash * seed
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        shift = self._shift
+        return [((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift for seed in self._SEEDS]
+    
+    def _record(self, key: Any) -> None:
+        """Count one access to a key"""
+        for row, index in zip(self._sketch, self._indexes(key)):
+            if row[index] < self._MAX_COUNT:
+                row[index] += 1
+        
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._reset()
+    
+    def _reset(self) -> None:
+        """Age the sketch by halving every counter"""
+        for row in self._sketch:
+            for index, count in enumerate(row):
+                if count:
+                    row[index] = count >> 1
+        self._additions //= 2
+    
+    def frequency(self, key: Any) -> int:
+        """Estimate how often a key has been accessed"""
+        return min(row[index] for row, index in zip(self._sketch, self._indexes(key)))
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Get value from cache"""
+        with self._lock:
+            self._record(key)
+            return super().get(key)
+    
+    def put(self, key: Any, value: Any) -> None:
+        """Put value in cache if the admission filter allows it"""
+        with self._lock:
+            self._record(key)
+            
+            if key not in self.cache and self.cache:
+                weight = self.getsizeof(value) if self.getsizeof else 1
+                if self.current_size + weight > self.max_size:
+                    # Full: the candidate has to be at least as popular as the victim
+                    victim = next(iter(self.cache))
+                    if self.frequency(key) < self.frequency(victim):
+                        return
+            
+            super().put(key, value)
+    
+    def clear(self) -> None:
+        """Clear cache and forget recorded frequencies"""
+        with self._lock:
+            super().clear()
+            for row in self._sketch:
+                row[:] = bytes(len(row))
+            self._additions = 0
+
+
+class TwoQueueCache(LRUCache):
+    """Scan-resistant cache with a probationary FIFO and a protected LRU (2Q)
+    
+    New entries land in a FIFO holding a quarter of max_size and only move
+    to the protected LRU segment, the inherited cache, when they are read
+    again. A burst of one-off lookups therefore churns the FIFO instead of
+    evicting entries that are in regular use. Sizes count entries.
+    """
+    
+    def __init__(self, max_size: int, on_evict: Optional[Callable[[Any, Any], None]] = None):
+        probation_size = max(1, max_size // 4)
+        super().__init__(max(0, max_size - probation_size), on_evict=on_evict)
+        self.probation_size = probation_size
+        # Ordered from oldest to newest insertion
+        self._probation: OrderedDict = OrderedDict()
+    
+    def __contains__(self, key: Any) -> bool:
+        return key in self.cache or key in self._probation
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Get value from cache, promoting probationary entries"""
+        with self._lock:
+            if key in self._probation:
+                if self.max_size <= 0:
+                    return self._probation[key]
+                # Second touch: move to the protected segment
+                super().put(key, self._probation.pop(key))
+            return super().get(key)
+    
+    def put(self, key: Any, value: Any) -> None:
+        """Put value in cache; new keys start out probationary"""
+        with self._lock:
+            if key in self.cache:
+                super().put(key, value)
+                return
+            
+            self._probation[key] = value
+            while len(self._probation) > self.probation_size:
+                victim, evicted = self._probation.popitem(last=False)
+                if self.on_evict:
+                    self.on_evict(victim, evicted)
+    
+    def pop(self, key: Any) -> Optional[Any]:
+        """Remove an entry, returning its value if it was cached"""
+        with self._lock:
+            if key in self._probation:
+                return self._probation.pop(key)
+            return super().pop(key)
+    
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Snapshot of the cached (key, value) pairs, probationary ones first"""
+        with self._lock:
+            return list(self._probation.items()) + super().items()
+    
+    def clear(self) -> None:
+        """Clear both segments"""
+        with self._lock:
+            super().clear()
+            self._probation.clear()
+    
+    def size(self) -> int:
+        """Get current cache size"""
+        return len(self.cache) + len(self._probation)
+    
+    def admission_size(self) -> int:
+        """Number of new entries the cache can take without evicting one of them"""
+        return self.probation_size
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries also expire ``ttl`` seconds after being stored"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        super().__init__(max_size)
+        self.ttl = ttl
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Get value from cache if it has not expired"""
+        with self._lock:
+            item = super().get(key)
+            if item is None:
+                return None
+            
+            expires_at, value = item
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return None
+            return value
+    
+    def put(self, key: Any, value: Any) -> None:
+        """Put value in cache with a fresh expiry time"""
+        if self.ttl > 0:
+            super().put(key, (time.monotonic() + self.ttl, value))
+
+
+class KeyedLocks:
+    """One lock per key, kept only while a thread holds it or waits for it
+    
+    Keys come from requests, so a plain dict of locks would grow with every
+    name ever asked for; here a lock goes away with its last reference.
+    """
+    
+    def __init__(self):
+        self._locks: weakref.WeakValueDictionary[Any, threading.Lock] = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> threading.Lock:
+        """Get the lock for a key, creating it if no thread is using one"""
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[key] = lock
+            return lock
+    
+    def __len__(self) -> int:
+        return len(self._locks)
 
 
 def validate_search_query(query: str) -> str:
@@ -4,18 +4,45 @@ ZIM file management for MCP ZIM Server
 Author: mobilemutex
 """
 
+import json
 import logging
+import os
+import sys
+import tempfile
+import threading
+import weakref
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from collections.abc import Callable, Iterator, Mapping
+from types import MappingProxyType
+from typing import Any
+from dataclasses import asdict, dataclass
+from concurrent.futures import ThreadPoolExecutor
 import libzim.reader # pyright: ignore[reportMissingModuleSource]
 from .config import ZimServerConfig
-from .utils import LRUCache, validate_zim_file_path, format_file_size, timing_decorator
+from .utils import KeyedLocks, LRUCache, TTLCache, TwoQueueCache, validate_zim_file_path, format_file_size, timing_decorator
 
 
-@dataclass
+# Archive cache implementations by ARCHIVE_CACHE_POLICY
+_ARCHIVE_CACHE_POLICIES = {"2q": TwoQueueCache, "lru": LRUCache}
+
+# Seconds a path found missing is reported missing without another stat
+_MISSING_PATH_TTL = 5.0
+
+class _Archive(libzim.reader.Archive):
+    """libzim Archive that can be weakly referenced"""
+    __slots__ = ("__weakref__",)
+
+
+# ZimManagerFileInfo fields also kept as columns of the discovery result
+_COLUMNS = ("filename", "title", "language", "creator", "size", "article_count")
+
+# Archive metadata keys that ZimManagerFileInfo reports
+_METADATA_KEYS = ("Title", "Description", "Language", "Creator", "Date")
+
+
+@dataclass(slots=True, frozen=True)
 class ZimManagerFileInfo:
-    """Information about a ZIM file"""
+    """Information about a ZIM file; shared between caches, so immutable"""
     filename: str
     filepath: Path
     size: int
@@ -32,6 +59,33 @@ class ZimManagerFileInfo:
     uuid: str
 
 
+@dataclass(slots=True, frozen=True)
+class ZimManifest:
+    """Immutable snapshot of one discovery scan
+    
+    Built once per scan and shared by every caller until the next one, so
+    readers never need to copy it.
+    """
+    files: tuple[ZimManagerFileInfo, ...]
+    by_filename: Mapping[str, ZimManagerFileInfo]
+    languages: frozenset[str]
+    # Selected fields column by column, in the order of files
+    columns: Mapping[str, tuple[Any, ...]]
+
+
+def _build_manifest(zim_files: list[ZimManagerFileInfo]) -> ZimManifest:
+    """Freeze a discovery result into a manifest"""
+    files = tuple(zim_files)
+    return ZimManifest(
+        files=files,
+        by_filename=MappingProxyType({file_info.filename: file_info for file_info in files}),
+        languages=frozenset(file_info.language for file_info in files),
+        columns=MappingProxyType({
+            name: tuple(getattr(file_info, name) for file_info in files) for name in _COLUMNS
+        })
+    )
+
+
 class ZimManager:
     """Manages ZIM file operations and caching"""
     
@@ -39,63 +93,241 @@ class ZimManager:
         self.config = config
         self.logger = logging.getLogger("mcp_zim_server.zim_manager")
         
-        # Cache for open archives
-        self.archive_cache = LRUCache(config.archive_cache_size)
+        # Cache for open archives. A lock per filename makes lookup-or-open
+        # atomic for that file, while different files open in parallel; the
+        # lock only exists while a thread is opening or waiting for the file.
+        self.archive_cache = _ARCHIVE_CACHE_POLICIES[config.archive_cache_policy](
+            config.archive_cache_size, on_evict=self._on_archive_evicted
+        )
+        self._archive_locks = KeyedLocks()
+        
+        # Every archive that is still referenced somewhere (by the cache or a
+        # running request), so one the cache has evicted can be reused instead
+        # of opened again. libzim's Archive has no weakref slot; get_archive
+        # opens the _Archive subclass, which does.
+        self._live_archives: weakref.WeakValueDictionary[str, _Archive] = weakref.WeakValueDictionary()
         
-        # Cache for file info
-        self.file_info_cache: Dict[str, ZimManagerFileInfo] = {}
+        # Resolved entries by (filename, "path" | "title", key). An entry keeps
+        # its archive's file open, so entries only stay cached while their
+        # archive does.
+        self.entry_cache = LRUCache(config.entry_cache_size)
         
-        # Track available ZIM files
-        self._available_files: Optional[List[ZimManagerFileInfo]] = None
+        # Paths recently found missing, so repeated requests for a file
+        # that does not exist skip the stat
+        self._missing_paths = TTLCache(256, _MISSING_PATH_TTL)
+        
+        # Cache for file info, with the (mtime, size) fingerprint it was read at;
+        # seeded from the persisted cache so restarts need not open archives
+        self.file_info_cache = LRUCache(config.file_info_cache_size)
+        self._file_info_dirty = False
+        self._save_lock = threading.Lock()
+        self._load_file_info_cache()
+        
+        # Validated paths of the files found by the last discovery, by filename
+        self._filename_to_path: dict[str, Path] = {}
+        
+        # Manifest of the available ZIM files, with the directory mtime it was scanned at
+        self._discovery_cache: tuple[int, ZimManifest] | None = None
+        
+        # Callbacks for caches kept outside the manager, called with the name
+        # of a file that was added, removed or replaced, or None when all are cleared
+        self._invalidation_listeners: list[Callable[[str | None], None]] = []
     
     @timing_decorator
-    def discover_zim_files(self, force_refresh: bool = False) -> List[ZimManagerFileInfo]:
-        """Discover all ZIM files in the configured directory"""
-        if self._available_files is not None and not force_refresh:
-            return self._available_files
-        
-        self.logger.info("Discovering ZIM files in %s", self.config.zim_files_directory)
+    def discover_zim_files(self, force_refresh: bool = False) -> tuple[ZimManagerFileInfo, ...]:
+        """Discover all ZIM files in the configured directory
         
-        zim_files = []
+        The scan is reused until the directory's mtime changes, i.e. until
+        a file is added, removed or renamed, so repeat calls cost one stat.
+        """
         zim_directory = self.config.zim_files_directory
         
-        if not zim_directory.exists():
+        try:
+            directory_mtime = zim_directory.stat().st_mtime_ns
+        except OSError:
             self.logger.warning("ZIM files directory does not exist: %s", zim_directory)
-            return []
+            return ()
         
-        # Find all .zim files
-        for zim_file in zim_directory.glob("*.zim"):
-            try:
-                file_info = self._get_zim_file_info(zim_file)
-                zim_files.append(file_info)
-                self.logger.debug("Found ZIM file: %s", file_info.filename)
-            except (OSError, RuntimeError, ValueError) as e:
-                self.logger.error("Error reading ZIM file %s: %s", zim_file, e)
+        discovery_cache = self._discovery_cache
+        if discovery_cache is not None and discovery_cache[0] == directory_mtime and not force_refresh:
+            return discovery_cache[1].files
+        
+        self.logger.info("Discovering ZIM files in %s", zim_directory)
+        
+        # The directory changed, so a missing file may have appeared
+        self._missing_paths.clear()
+        
+        # Find all .zim files in one directory pass. Each file is stat'ed
+        # once, by its entry; that result supplies size, fingerprint and
+        # existence, and the entry's type tells which paths need resolving.
+        candidates = []
+        symlinks = set()
+        try:
+            with os.scandir(zim_directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.zim'):
+                        continue
+                    try:
+                        if entry.is_file():
+                            candidates.append((Path(entry.path), entry.stat()))
+                            if entry.is_symlink():
+                                symlinks.add(entry.name)
+                    except OSError as e:
+                        self.logger.error("Error reading ZIM file %s: %s", entry.path, e)
+        except OSError as e:
+            self.logger.error("Error scanning ZIM files directory %s: %s", zim_directory, e)
+            return ()
+        
+        # New and replaced files: whatever was cached under their names,
+        # search results that found no such file included, is out of date
+        stale = [filepath.name for filepath, stat in candidates if not self._has_current_info(filepath, stat)]
+        for filename in stale:
+            self.forget_file(filename)
+        
+        # Opening archives is blocking I/O that libzim runs without the GIL,
+        # so files whose info must be (re)read are read in parallel
+        workers = min(self.config.discovery_concurrency, len(stale))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                file_infos = list(pool.map(self._read_file_info, candidates))
+        else:
+            file_infos = list(map(self._read_file_info, candidates))
+        
+        # One unreadable file only drops that file
+        zim_files = [file_info for file_info in file_infos if file_info is not None]
+        
+        # Forget files that are gone, then persist whatever changed
+        found = {file_info.filename for file_info in zim_files}
+        known = {filename for filename, _ in self.file_info_cache.items()}
+        if discovery_cache is not None:
+            known.update(discovery_cache[1].by_filename)
+        for filename in known - found:
+            if self.file_info_cache.pop(filename) is not None:
+                self._file_info_dirty = True
+            self.forget_file(filename)
+        if self._file_info_dirty:
+            self._save_file_info_cache()
+            # Writing the cache file into the directory changes its mtime;
+            # don't let that alone invalidate the scan just made
+            cache_file = self.config.metadata_cache_file
+            if cache_file is not None and cache_file.parent.resolve() == zim_directory.resolve():
+                try:
+                    directory_mtime = zim_directory.stat().st_mtime_ns
+                except OSError:
+                    pass
+        
+        # Validate discovered paths once here rather than on every request.
+        # A regular file directly in the directory resolves to the resolved
+        # directory plus its name; only symlinks can point elsewhere.
+        filename_to_path = {}
+        resolved_directory = zim_directory.resolve()
+        for file_info in zim_files:
+            if file_info.filename not in symlinks:
+                filename_to_path[file_info.filename] = resolved_directory / file_info.filename
                 continue
+            try:
+                filename_to_path[file_info.filename] = validate_zim_file_path(file_info.filename, zim_directory)
+            except (OSError, ValueError) as e:
+                self.logger.warning("Skipping ZIM file path %s: %s", file_info.filepath, e)
+        self._filename_to_path = filename_to_path
         
-        self._available_files = zim_files
+        # Swap in the new manifest as a whole
+        manifest = _build_manifest(zim_files)
+        self._discovery_cache = (directory_mtime, manifest)
+        
+        # Open the newest archives in the background, so the first requests
+        # for them do not pay the open. No more than the cache admits at once:
+        # 2Q would push the first ones out of its probation FIFO again.
+        prewarm_count = min(self.config.prewarm_count, self.archive_cache.admission_size())
+        if prewarm_count > 0 and zim_files:
+            mtimes = {filepath.name: stat.st_mtime_ns for filepath, stat in candidates}
+            newest = sorted(zim_files, key=lambda file_info: mtimes[file_info.filename], reverse=True)
+            filenames = [file_info.filename for file_info in newest[:prewarm_count]]
+            threading.Thread(target=self._prewarm, args=(filenames,), name="zim-prewarm", daemon=True).start()
         self.logger.info("Discovered %d ZIM files", len(zim_files))
-        return zim_files
+        return manifest.files
     
-    def _get_zim_file_info(self, filepath: Path) -> ZimManagerFileInfo:
-        """Get information about a ZIM file"""
-        filename = filepath.name
+    def _prewarm(self, filenames: list[str]) -> None:
+        """Open archives ahead of their first request while the cache has room"""
+        for filename in filenames:
+            if self.archive_cache.size() >= self.config.archive_cache_size:
+                break
+            if filename not in self.archive_cache:
+                self.get_archive(filename)
+    
+    def get_manifest(self) -> ZimManifest:
+        """Get the manifest of the current discovery result"""
+        zim_files = self.discover_zim_files()
+        discovery_cache = self._discovery_cache
+        if discovery_cache is None or discovery_cache[1].files is not zim_files:
+            return _build_manifest(list(zim_files))
+        return discovery_cache[1]
+    
+    def list_filenames(self) -> list[str]:
+        """List the filenames of all discovered ZIM files"""
+        return list(self.get_manifest().columns["filename"])
+    
+    def list_languages(self) -> list[str]:
+        """List the distinct languages of the discovered ZIM files"""
+        return list(dict.fromkeys(self.get_manifest().columns["language"]))
+    
+    def iter_by_language(self, language: str) -> Iterator[ZimManagerFileInfo]:
+        """Iterate over the discovered ZIM files in a language"""
+        manifest = self.get_manifest()
+        if language not in manifest.languages:
+            return
+        for file_info, file_language in zip(manifest.files, manifest.columns["language"]):
+            if file_language == language:
+                yield file_info
+    
+    def _has_current_info(self, filepath: Path, stat: os.stat_result) -> bool:
+        """Check whether the cached info for a file matches its stat"""
+        cached = self.file_info_cache.get(filepath.name)
+        return cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size)
+    
+    def _read_file_info(self, candidate: tuple[Path, os.stat_result]) -> ZimManagerFileInfo | None:
+        """Get info for a discovered file, or None if it cannot be read"""
+        filepath, stat = candidate
+        try:
+            file_info = self._get_zim_file_info(filepath, stat)
+            self.logger.debug("Found ZIM file: %s", file_info.filename)
+            return file_info
+        except (OSError, RuntimeError, ValueError) as e:
+            self.logger.error("Error reading ZIM file %s: %s", filepath, e)
+            return None
+    
+    def _get_zim_file_info(self, filepath: Path, stat: os.stat_result | None = None) -> ZimManagerFileInfo:
+        """Get information about a ZIM file, stat'ing it only if stat is not given
         
-        # Check cache first
-        if filename in self.file_info_cache:
-            return self.file_info_cache[filename]
+        The archive is only opened when the file's (mtime, size) fingerprint
+        differs from the cached one.
+        """
+        filename = filepath.name
         
         try:
+            # Get basic file stats
+            if stat is None:
+                stat = filepath.stat()
+            fingerprint = (stat.st_mtime_ns, stat.st_size)
+            
+            # Check cache first
+            cached = self.file_info_cache.get(filename)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1]
+            
             # Open archive to read metadata
             archive = libzim.reader.Archive(str(filepath))
-            # Get basic file stats
-            file_size = filepath.stat().st_size
+            file_size = stat.st_size
 
-            # Extract metadata
+            # Extract only the metadata that is reported. libzim returns
+            # bytes; decoding keeps the info JSON-serializable.
             metadata = {}
-            for key in archive.metadata_keys:
+            present = set(archive.metadata_keys)
+            for key in _METADATA_KEYS:
+                if key not in present:
+                    continue
                 try:
-                    metadata[key] = archive.get_metadata(key)
+                    metadata[key] = archive.get_metadata(key).decode("utf-8", "replace")
                 except (KeyError, ValueError):
                     metadata[key] = ""
 
@@ -108,8 +340,9 @@ class ZimManager:
                 media_count=archive.media_count,
                 title=metadata.get("Title", filename),
                 description=metadata.get("Description", ""),
-                language=metadata.get("Language", ""),
-                creator=metadata.get("Creator", ""),
+                # Few distinct values across files; share one string each
+                language=sys.intern(metadata.get("Language", "")),
+                creator=sys.intern(metadata.get("Creator", "")),
                 date=metadata.get("Date", ""),
                 has_fulltext_index=archive.has_fulltext_index,
                 has_title_index=archive.has_title_index,
@@ -117,51 +350,156 @@ class ZimManager:
             )
 
             # Cache the info
-            self.file_info_cache[filename] = file_info
+            self.file_info_cache.put(filename, (fingerprint, file_info))
+            self._file_info_dirty = True
             return file_info
                 
         except (OSError, RuntimeError, ValueError) as e:
             self.logger.error("Error reading ZIM file metadata %s: %s", filepath, e)
             raise
     
-    def get_zim_file_info(self, filename: str) -> Optional[ZimManagerFileInfo]:
+    def get_zim_file_info(self, filename: str) -> ZimManagerFileInfo | None:
         """Get information about a specific ZIM file"""
         try:
-            filepath = validate_zim_file_path(filename, self.config.zim_files_directory)
+            filepath = self._resolve(filename)
             
-            if not filepath.exists():
+            if self._missing_paths.get(str(filepath)) is not None:
+                return None
+            try:
+                stat = filepath.stat()
+            except FileNotFoundError:
+                self._missing_paths.put(str(filepath), True)
                 return None
             
-            return self._get_zim_file_info(filepath)
+            return self._get_zim_file_info(filepath, stat)
             
         except (OSError, RuntimeError, ValueError) as e:
             self.logger.error("Error getting ZIM file info for %s: %s", filename, e)
             return None
     
-    def get_archive(self, filename: str) -> Optional[libzim.reader.Archive]:
+    def _load_file_info_cache(self) -> None:
+        """Seed the file info cache from the persisted cache file, if any"""
+        cache_file = self.config.metadata_cache_file
+        if cache_file is None:
+            return
+        
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                persisted = json.load(f)
+            
+            zim_directory = self.config.zim_files_directory
+            for filename, (fingerprint, fields) in persisted.items():
+                fields["language"] = sys.intern(fields["language"])
+                fields["creator"] = sys.intern(fields["creator"])
+                file_info = ZimManagerFileInfo(filepath=zim_directory / filename, **fields)
+                self.file_info_cache.put(filename, (tuple(fingerprint), file_info))
+            self.logger.debug("Loaded %d cached ZIM file infos", len(persisted))
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError, ValueError, TypeError, AttributeError) as e:
+            # A stale or corrupt cache only costs a rescan
+            self.logger.warning("Ignoring ZIM file info cache %s: %s", cache_file, e)
+            self.file_info_cache.clear()
+    
+    def _save_file_info_cache(self) -> None:
+        """Write the file info cache to the persisted cache file, if any
+        
+        Saves from concurrent discoveries run one at a time. The dirty flag
+        is cleared before the snapshot is taken, so info cached while a save
+        runs is written by the next one.
+        """
+        cache_file = self.config.metadata_cache_file
+        with self._save_lock:
+            self._file_info_dirty = False
+            if cache_file is None:
+                return
+            
+            persisted = {}
+            for filename, (fingerprint, file_info) in self.file_info_cache.items():
+                fields = asdict(file_info)
+                del fields["filepath"]
+                persisted[filename] = (fingerprint, fields)
+            
+            # Write a temporary file of our own, then rename it, so readers
+            # never see a partial file
+            temp_name = None
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", dir=cache_file.parent,
+                    prefix=cache_file.name + ".", suffix=".tmp", delete=False
+                ) as f:
+                    temp_name = f.name
+                    json.dump(persisted, f)
+                os.replace(temp_name, cache_file)
+            except (OSError, TypeError, ValueError) as e:
+                self.logger.warning("Could not write ZIM file info cache %s: %s", cache_file, e)
+                if temp_name is not None:
+                    try:
+                        os.unlink(temp_name)
+                    except OSError:
+                        pass
+    
+    def _resolve(self, filename: str) -> Path:
+        """Get the validated path of a ZIM file, preferring the last discovery"""
+        filepath = self._filename_to_path.get(filename)
+        if filepath is not None:
+            return filepath
+        return validate_zim_file_path(filename, self.config.zim_files_directory)
+    
+    def _is_missing(self, filepath: Path) -> bool:
+        """Check whether a file does not exist, trusting a recent negative answer"""
+        cache_key = str(filepath)
+        if self._missing_paths.get(cache_key) is not None:
+            return True
+        if filepath.exists():
+            return False
+        self._missing_paths.put(cache_key, True)
+        return True
+    
+    def _cached_archive(self, filename: str) -> libzim.reader.Archive | None:
+        """Get an open archive from the cache, or a live one the cache evicted"""
+        archive = self.archive_cache.get(filename)
+        if archive is None:
+            archive = self._live_archives.get(filename)
+            if archive is not None:
+                # Still in use elsewhere; keep it cached again
+                self.archive_cache.put(filename, archive)
+        return archive
+    
+    def get_archive(self, filename: str) -> libzim.reader.Archive | None:
         """Get an open ZIM archive, using cache when possible"""
         try:
+            # Archives are cached by the name they were requested under and
+            # were validated when opened, so a hit needs no resolve or stat
+            if not self.config.strict_file_validation:
+                cached_archive = self._cached_archive(filename)
+                if cached_archive is not None:
+                    self.logger.debug("Using cached archive for %s", filename)
+                    return cached_archive
+            
             # Validate file path
-            filepath = validate_zim_file_path(filename, self.config.zim_files_directory)
+            filepath = self._resolve(filename)
             
-            if not filepath.exists():
+            if self._is_missing(filepath):
                 self.logger.error("ZIM file not found: %s", filepath)
                 return None
             
-            # Check cache
-            cache_key = str(filepath)
-            cached_archive = self.archive_cache.get(cache_key)
-            
-            if cached_archive is not None:
-                self.logger.debug("Using cached archive for %s", filename)
-                return cached_archive
-            
-            # Open new archive
-            self.logger.debug("Opening new archive for %s", filename)
-            archive = libzim.reader.Archive(str(filepath))
-            
-            # Cache the archive
-            self.archive_cache.put(cache_key, archive)
+            with self._archive_locks.get(filename):
+                # Another thread may have opened it while we waited
+                cached_archive = self._cached_archive(filename)
+                
+                if cached_archive is not None:
+                    self.logger.debug("Using cached archive for %s", filename)
+                    return cached_archive
+                
+                # Open new archive
+                self.logger.debug("Opening new archive for %s", filename)
+                archive = _Archive(str(filepath))
+                
+                # Cache the archive
+                self.archive_cache.put(filename, archive)
+                self._live_archives[filename] = archive
             
             return archive
             
@@ -169,39 +507,67 @@ class ZimManager:
             self.logger.error("Error opening ZIM archive %s: %s", filename, e)
             return None
     
-    def get_entry_by_path(self, filename: str, entry_path: str) -> Optional[libzim.reader.Entry]:
+    def _cache_entry(self, cache_key: tuple[str, str, str], entry: libzim.reader.Entry) -> None:
+        """Cache a resolved entry, unless its archive was evicted meanwhile"""
+        self.entry_cache.put(cache_key, entry)
+        if cache_key[0] not in self.archive_cache:
+            self.entry_cache.pop(cache_key)
+    
+    def _on_archive_evicted(self, filename: str, archive: _Archive) -> None:
+        """Drop the cached entries of an evicted archive, which would keep its file open"""
+        for key, _ in self.entry_cache.items():
+            if key[0] == filename:
+                self.entry_cache.pop(key)
+    
+    def get_entry_by_path(self, filename: str, entry_path: str) -> libzim.reader.Entry | None:
         """Get an entry from a ZIM file by path"""
+        cache_key = (filename, "path", entry_path)
+        if not self.config.strict_file_validation:
+            cached_entry = self.entry_cache.get(cache_key)
+            if cached_entry is not None:
+                return cached_entry
+        
         try:
             archive = self.get_archive(filename)
             if archive is None:
                 return None
             
-            if not archive.has_entry_by_path(entry_path):
-                return None
-            
-            return archive.get_entry_by_path(entry_path)
+            # One lookup; libzim raises KeyError for a missing entry
+            entry = archive.get_entry_by_path(entry_path)
+            self._cache_entry(cache_key, entry)
+            return entry
             
-        except (KeyError, ValueError, RuntimeError, OSError) as e:
+        except KeyError:
+            return None
+        except (ValueError, RuntimeError, OSError) as e:
             self.logger.error("Error getting entry %s from %s: %s", entry_path, filename, e)
             return None
     
-    def get_entry_by_title(self, filename: str, title: str) -> Optional[libzim.reader.Entry]:
+    def get_entry_by_title(self, filename: str, title: str) -> libzim.reader.Entry | None:
         """Get an entry from a ZIM file by title"""
+        cache_key = (filename, "title", title)
+        if not self.config.strict_file_validation:
+            cached_entry = self.entry_cache.get(cache_key)
+            if cached_entry is not None:
+                return cached_entry
+        
         try:
             archive = self.get_archive(filename)
             if archive is None:
                 return None
             
-            if not archive.has_entry_by_title(title):
-                return None
-            
-            return archive.get_entry_by_title(title)
+            # One lookup; libzim raises KeyError for a missing entry
+            entry = archive.get_entry_by_title(title)
+            self._cache_entry(cache_key, entry)
+            return entry
             
-        except (KeyError, ValueError, RuntimeError, OSError) as e:
+        except KeyError:
+            return None
+        except (ValueError, RuntimeError, OSError) as e:
             self.logger.error("Error getting entry by title '%s' from %s: %s", title, filename, e)
             return None
     
-    def get_main_entry(self, filename: str) -> Optional[libzim.reader.Entry]:
+    def get_main_entry(self, filename: str) -> libzim.reader.Entry | None:
         """Get the main entry of a ZIM file"""
         try:
             archive = self.get_archive(filename)
@@ -217,7 +583,7 @@ class ZimManager:
             self.logger.error("Error getting main entry from %s: %s", filename, e)
             return None
     
-    def get_random_entry(self, filename: str) -> Optional[libzim.reader.Entry]:
+    def get_random_entry(self, filename: str) -> libzim.reader.Entry | None:
         """Get a random entry from a ZIM file"""
         try:
             archive = self.get_archive(filename)
@@ -233,9 +599,13 @@ class ZimManager:
     def validate_zim_file(self, filename: str) -> bool:
         """Validate that a ZIM file exists and is readable"""
         try:
-            filepath = validate_zim_file_path(filename, self.config.zim_files_directory)
+            # A cached archive was validated when it was opened
+            if not self.config.strict_file_validation and filename in self.archive_cache:
+                return True
+            
+            filepath = self._resolve(filename)
             
-            if not filepath.exists():
+            if self._is_missing(filepath):
                 return False
             
             # Try to open the archive
@@ -245,19 +615,83 @@ class ZimManager:
         except (OSError, RuntimeError, ValueError):
             return False
     
+    def get_file_fingerprint(self, filename: str) -> tuple[int, int] | None:
+        """Get the (mtime, size) fingerprint of a ZIM file, or None if it is gone
+        
+        Costs one stat. Cached state for a file that was removed, or that
+        changed since its info was read, is dropped first.
+        """
+        try:
+            filepath = self._resolve(filename)
+            stat = filepath.stat()
+        except FileNotFoundError:
+            self.forget_file(filename)
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.error("Error checking ZIM file %s: %s", filename, e)
+            return None
+        
+        fingerprint = (stat.st_mtime_ns, stat.st_size)
+        cached = self.file_info_cache.get(filepath.name)
+        if cached is not None and cached[0] != fingerprint:
+            self.forget_file(filename)
+            try:
+                # Record the new fingerprint, so the file is only forgotten once
+                self._get_zim_file_info(filepath, stat)
+            except (OSError, RuntimeError, ValueError):
+                return None
+        return fingerprint
+    
+    def add_invalidation_listener(self, listener: Callable[[str | None], None]) -> None:
+        """Register a callback for files whose cached state is dropped
+        
+        The callback gets the filename of an added, removed or replaced ZIM
+        file, or None when every cache is cleared.
+        """
+        self._invalidation_listeners.append(listener)
+    
+    def forget_file(self, filename: str) -> None:
+        """Drop the archives and entries cached for an added, removed or replaced ZIM file"""
+        # Files are cached under every name they were requested by
+        name = Path(filename).name
+        for key, _ in self.archive_cache.items():
+            if Path(key).name == name:
+                self.archive_cache.pop(key)
+        for key in list(self._live_archives.keys()):
+            if Path(key).name == name:
+                self._live_archives.pop(key, None)
+        for key, _ in self.entry_cache.items():
+            if Path(key[0]).name == name:
+                self.entry_cache.pop(key)
+        
+        for listener in self._invalidation_listeners:
+            listener(name)
+        self.logger.debug("Forgot cached state for %s", name)
+    
     def clear_caches(self) -> None:
         """Clear all caches"""
         self.archive_cache.clear()
+        self._live_archives.clear()
         self.file_info_cache.clear()
-        self._available_files = None
+        self.entry_cache.clear()
+        self._missing_paths.clear()
+        self._filename_to_path = {}
+        self._discovery_cache = None
+        for listener in self._invalidation_listeners:
+            listener(None)
         self.logger.info("Cleared all caches")
     
-    def get_cache_stats(self) -> Dict[str, Any]:
+    def get_cache_stats(self) -> dict[str, Any]:
         """Get cache statistics"""
         return {
             "archive_cache_size": self.archive_cache.size(),
             "archive_cache_max_size": self.config.archive_cache_size,
-            "file_info_cache_size": len(self.file_info_cache),
-            "available_files_cached": self._available_files is not None
+            "archive_cache_policy": self.config.archive_cache_policy,
+            "live_archives": len(self._live_archives),
+            "entry_cache_size": self.entry_cache.size(),
+            "entry_cache_max_size": self.config.entry_cache_size,
+            "file_info_cache_size": self.file_info_cache.size(),
+            "file_info_cache_max_size": self.config.file_info_cache_size,
+            "available_files_cached": self._discovery_cache is not None
         }
 
@@ -0,0 +1,100 @@
+"""
+Shared fixtures: small ZIM files built with libzim.writer
+
+Author: mobilemutex
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pytest
+
+# zim_mcp.config loads its configuration at import time; point it at a
+# scratch directory before any test module imports the package.
+SERVER_ZIM_DIRECTORY = Path(tempfile.mkdtemp(prefix="zim-mcp-tests-"))
+os.environ["ZIM_FILES_DIRECTORY"] = str(SERVER_ZIM_DIRECTORY)
+os.environ["METADATA_CACHE_FILE"] = ""
+
+from libzim.writer import Creator, Hint, Item, StringProvider  # noqa: E402 pyright: ignore[reportMissingModuleSource]
+
+from zim_mcp.config import ZimServerConfig  # noqa: E402
+
+
+class _HtmlItem(Item):
+    """HTML article written into a test ZIM"""
+
+    def __init__(self, path: str, title: str, html: str):
+        super().__init__()
+        self.path = path
+        self.title = title
+        self.html = html
+
+    def get_path(self) -> str:
+        return self.path
+
+    def get_title(self) -> str:
+        return self.title
+
+    def get_mimetype(self) -> str:
+        return "text/html"
+
+    def get_contentprovider(self) -> StringProvider:
+        return StringProvider(self.html)
+
+    def get_hints(self) -> dict:
+        return {Hint.FRONT_ARTICLE: True}
+
+
+def write_zim(zim_path: Path, entries: List[Tuple[str, str, str]], language: str = "eng") -> Path:
+    """Write (path, title, html) entries into a ZIM file with full-text and title indexes"""
+    with Creator(str(zim_path)).config_indexing(True, language) as creator:
+        creator.set_mainpath(entries[0][0])
+        for path, title, html in entries:
+            creator.add_item(_HtmlItem(path, title, html))
+        creator.add_metadata("Title", zim_path.stem)
+        creator.add_metadata("Language", language)
+    return zim_path
+
+
+def article_html(word: str, repeat: int, number: int) -> str:
+    """Article body where ``word`` appears ``repeat`` times, so relevance follows ``repeat``"""
+    return (f"<html><head><title>Article {number}</title></head>"
+            f"<body><h1 id=\"top\">Article {number}</h1>"
+            f"<p>{(word + ' ') * repeat}text {number}</p></body></html>")
+
+
+def alpha_entries(count: int = 20) -> List[Tuple[str, str, str]]:
+    """Entries A1..An titled "Alpha Article i", where A{i} mentions "apple" i times"""
+    return [(f"A{i}", f"Alpha Article {i}", article_html("apple", i, i)) for i in range(1, count + 1)]
+
+
+def beta_entries(count: int = 20) -> List[Tuple[str, str, str]]:
+    """Entries B1..Bn titled "Beta Article i", where B{i} mentions "apple" i times"""
+    return [(f"B{i}", f"Beta Article {i}", article_html("apple", i, i)) for i in range(1, count + 1)]
+
+
+@pytest.fixture(scope="session")
+def zim_templates(tmp_path_factory) -> Path:
+    """alpha.zim and beta.zim, written once per session"""
+    directory = tmp_path_factory.mktemp("templates")
+    write_zim(directory / "alpha.zim", alpha_entries())
+    write_zim(directory / "beta.zim", beta_entries())
+    return directory
+
+
+@pytest.fixture
+def zim_dir(tmp_path, zim_templates) -> Path:
+    """A fresh directory holding copies of alpha.zim and beta.zim"""
+    for name in ("alpha.zim", "beta.zim"):
+        (tmp_path / name).write_bytes((zim_templates / name).read_bytes())
+    return tmp_path
+
+
+@pytest.fixture
+def make_config(zim_dir) -> Callable[..., ZimServerConfig]:
+    """Build a ZimServerConfig for zim_dir, overriding any field by keyword"""
+    def factory(**overrides) -> ZimServerConfig:
+        return ZimServerConfig(zim_files_directory=zim_dir, **overrides)
+    return factory
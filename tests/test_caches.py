@@ -0,0 +1,190 @@
+"""
+Eviction and admission behaviour of the cache classes in zim_mcp.utils
+
+Author: mobilemutex
+"""
+
+import gc
+import threading
+
+import pytest
+
+from zim_mcp.utils import KeyedLocks, LRUCache, TTLCache, TinyLFUCache, TwoQueueCache
+from zim_mcp.zim_manager import ZimManager
+
+
+def test_lru_evicts_least_recently_used():
+    evicted = []
+    cache = LRUCache(2, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert evicted == ["b"]
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_lru_bounds_total_size_with_getsizeof():
+    cache = LRUCache(10, getsizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+
+    assert cache.current_size == 8
+    assert "a" not in cache
+
+    # A value larger than the whole cache is not stored
+    cache.put("d", "x" * 11)
+    assert "d" not in cache
+    assert cache.current_size == 8
+
+
+def test_tinylfu_rejects_candidate_colder_than_victim():
+    cache = TinyLFUCache(2)
+    cache.put("hot", 1)
+    cache.put("warm", 2)
+    for _ in range(5):
+        cache.get("hot")
+        cache.get("warm")
+
+    cache.put("scan", 3)
+
+    assert "scan" not in cache
+    assert "hot" in cache and "warm" in cache
+
+
+def test_tinylfu_admits_candidate_as_popular_as_victim():
+    cache = TinyLFUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    for _ in range(3):
+        cache.get("c")
+
+    cache.put("c", 3)
+
+    assert "c" in cache
+    assert "a" not in cache
+
+
+def test_two_queue_scan_does_not_flush_protected_entries():
+    cache = TwoQueueCache(8)
+    assert cache.probation_size == 2
+    cache.put("hot", 1)
+    assert cache.get("hot") == 1  # second touch promotes it
+
+    for index in range(20):
+        cache.put(f"scan{index}", index)
+
+    assert "hot" in cache
+    assert cache.size() == 3
+    assert "scan19" in cache and "scan18" in cache and "scan0" not in cache
+
+
+def test_two_queue_reports_probation_evictions():
+    evicted = []
+    cache = TwoQueueCache(4, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert evicted == ["a"]
+    assert cache.pop("b") == 2
+    assert cache.size() == 0
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("zim_mcp.utils.time.monotonic", lambda: now[0])
+    cache = TTLCache(4, ttl=10)
+    cache.put("a", 1)
+
+    now[0] = 109.0
+    assert cache.get("a") == 1
+    now[0] = 110.0
+    assert cache.get("a") is None
+    assert "a" not in cache
+
+
+def test_ttl_cache_disabled_with_zero_ttl():
+    cache = TTLCache(4, ttl=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_keyed_locks_are_shared_while_in_use_then_dropped():
+    locks = KeyedLocks()
+
+    held = locks.get("a")
+    with held:
+        assert locks.get("a") is held
+        assert len(locks) == 1
+
+    del held
+    assert len(locks) == 0
+
+
+def test_archive_cache_respects_its_bound(make_config):
+    manager = ZimManager(make_config(archive_cache_size=1, archive_cache_policy="lru"))
+
+    alpha = manager.get_archive("alpha.zim")
+    assert manager.get_archive("alpha.zim") is alpha
+
+    manager.get_archive("beta.zim")
+    assert manager.archive_cache.size() == 1
+    assert "alpha.zim" not in manager.archive_cache
+
+
+def test_evicted_archive_still_referenced_is_reused(make_config):
+    manager = ZimManager(make_config(archive_cache_size=1, archive_cache_policy="lru"))
+
+    alpha = manager.get_archive("alpha.zim")
+    manager.get_archive("beta.zim")
+    assert "alpha.zim" not in manager.archive_cache
+
+    assert manager.get_archive("alpha.zim") is alpha
+    assert "alpha.zim" in manager.archive_cache
+
+
+def test_evicted_archive_no_longer_referenced_is_reopened(make_config):
+    manager = ZimManager(make_config(archive_cache_size=1, archive_cache_policy="lru"))
+
+    manager.get_archive("alpha.zim")
+    manager.get_archive("beta.zim")
+    gc.collect()
+
+    assert "alpha.zim" not in manager._live_archives
+    assert manager.get_archive("alpha.zim") is not None
+    assert manager.get_cache_stats()["live_archives"] == 1
+
+
+def test_admission_size_is_the_probation_window_under_2q():
+    assert LRUCache(8).admission_size() == 8
+    assert TwoQueueCache(8).admission_size() == 2
+
+
+@pytest.mark.parametrize("policy,expected", [("2q", 1), ("lru", 2)])
+def test_prewarm_stays_within_the_admission_window(make_config, monkeypatch, policy, expected):
+    prewarmed = []
+    monkeypatch.setattr(ZimManager, "_prewarm", lambda self, filenames: prewarmed.extend(filenames))
+    manager = ZimManager(make_config(archive_cache_size=4, archive_cache_policy=policy, prewarm_count=2))
+
+    manager.discover_zim_files()
+    for thread in threading.enumerate():
+        if thread.name == "zim-prewarm":
+            thread.join()
+
+    assert len(prewarmed) == expected
+
+
+@pytest.mark.parametrize("policy", ["2q", "lru"])
+def test_evicting_an_archive_drops_its_cached_entries(make_config, policy):
+    manager = ZimManager(make_config(archive_cache_size=1, archive_cache_policy=policy))
+
+    assert manager.get_entry_by_path("alpha.zim", "A1").title == "Alpha Article 1"
+    assert manager.get_entry_by_title("alpha.zim", "Alpha Article 2").path == "A2"
+    assert manager.entry_cache.size() == 2
+
+    manager.get_entry_by_path("beta.zim", "B1")
+
+    assert "alpha.zim" not in manager.archive_cache
+    assert {key[0] for key, _ in manager.entry_cache.items()} == {"beta.zim"}
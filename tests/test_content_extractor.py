@@ -0,0 +1,129 @@
+"""
+Content extraction from ZIM entries
+
+Author: mobilemutex
+"""
+
+import time
+
+import pytest
+
+from conftest import article_html, write_zim
+from zim_mcp.content_extractor import ContentExtractor
+from zim_mcp.utils import clean_html_content
+from zim_mcp.zim_manager import ZimManager
+
+PAGE = ('<html><head><title> Page </title><meta name="description" content="About it"></head>'
+        '<body><h1 id="top">Top <b>part</b></h1><p>See <a href="/one">one</a> and '
+        '<a href="/two"><img src="x.png"></a></p><h3>Tail</h3></body></html>')
+
+
+def make_extractor(make_config, **overrides) -> ContentExtractor:
+    config = make_config(**overrides)
+    return ContentExtractor(config, ZimManager(config))
+
+
+def test_extract_text_with_metadata(make_config):
+    extractor = make_extractor(make_config)
+    html = article_html("apple", 2, 2)
+
+    info = extractor.extract_entry_content("alpha.zim", "A2", "text")
+
+    assert info.content == clean_html_content(html)
+    assert info.content_length == len(html.encode())
+    assert info.metadata == {"html_title": "Article 2"}
+    assert info.preview == info.content
+
+
+def test_extract_html_and_raw_keep_markup(make_config):
+    extractor = make_extractor(make_config)
+    html = article_html("apple", 2, 2)
+
+    assert extractor.extract_entry_content("alpha.zim", "A2", "html").content == html
+    raw = extractor.extract_entry_content("alpha.zim", "A2", "raw")
+    assert raw.content == html
+    assert raw.metadata == {}
+
+
+def test_metadata_table_of_contents_and_links(make_config):
+    extractor = make_extractor(make_config)
+
+    assert extractor._extract_metadata(PAGE) == {
+        "html_title": "Page",
+        "description": "About it",
+        "image_count": 1,
+        "link_count": 2,
+    }
+    assert extractor.extract_table_of_contents(PAGE) == [
+        {"level": 1, "id": "top", "text": "Top part"},
+        {"level": 3, "id": "", "text": "Tail"},
+    ]
+    assert extractor.extract_links(PAGE) == [{"href": "/one", "text": "one"}]
+    assert extractor.extract_links("no markup") == []
+
+
+def test_elements_pair_with_the_next_closing_tag(make_config):
+    extractor = make_extractor(make_config)
+    html = '<h2>lost<h2 id="x">Kept</h2></h2><a name="n">none</a><A HREF=\'/b\'>b<a href="/c">c</a></a>'
+
+    assert extractor.extract_table_of_contents(html) == [{"level": 2, "id": "x", "text": "Kept"}]
+    assert extractor.extract_links(html) == [{"href": "/c", "text": "c"}]
+
+
+@pytest.mark.parametrize("unit", ["<title>x", "<h1>x", '<a href="x">y', "<img", "<title",
+                                  '<meta name="description" content="x', "<h2 id='a'>x</h3"])
+def test_scans_stay_linear_on_unclosed_tags(make_config, unit):
+    extractor = make_extractor(make_config)
+    html = unit * 20000
+
+    start = time.perf_counter()
+    extractor._extract_metadata(html)
+    extractor.extract_table_of_contents(html)
+    extractor.extract_links(html)
+
+    assert time.perf_counter() - start < 2.0
+
+
+def test_html_scan_is_reused_for_identical_documents(make_config):
+    extractor = make_extractor(make_config)
+
+    first = extractor._scan_html(PAGE)
+
+    assert extractor._scan_html(PAGE) is first
+    assert first.text == clean_html_content(PAGE)
+
+
+def test_html_scan_cache_is_bounded_by_text_length(make_config):
+    extractor = make_extractor(make_config, parse_cache_size=100)
+    documents = [f"<p>{index} {'x' * 40}</p>" for index in range(4)]
+
+    for document in documents:
+        extractor._scan_html(document)
+
+    assert extractor.parse_cache.current_size <= 100
+    assert extractor.parse_cache.size() == 2
+
+
+# "<b>wörd</b> " is 13 bytes; the prefix sets where the first 1024-byte window cuts a unit
+PREVIEW_UNIT = "<b>wörd</b> "
+PREVIEW_PAGES = {
+    "split-char": "<div>" + PREVIEW_UNIT * 200,  # cut between the two bytes of "ö"
+    "split-tag": "<html><p>" + PREVIEW_UNIT * 200,  # cut right after a "<"
+    "no-text-head": '<span class="filler"></span>' * 60 + PREVIEW_UNIT * 200,  # window must grow
+}
+
+
+@pytest.mark.parametrize("path", sorted(PREVIEW_PAGES))
+def test_preview_decodes_only_whole_characters_and_tags(make_config, zim_dir, path):
+    write_zim(zim_dir / "preview.zim", [(name, name, html) for name, html in PREVIEW_PAGES.items()])
+    extractor = make_extractor(make_config)
+    html = PREVIEW_PAGES[path]
+
+    info = extractor.extract_preview_only("preview.zim", path, 10)
+
+    full_text = clean_html_content(html)
+    assert len(info.content) > 10
+    assert len(info.content) < len(full_text)
+    assert full_text.startswith(info.content)
+    assert "\ufffd" not in info.content and "<" not in info.content
+    assert info.content_length == len(html.encode())
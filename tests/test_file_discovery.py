@@ -0,0 +1,23 @@
+"""
+Directory scans and statistics from FileDiscovery
+
+Author: mobilemutex
+"""
+
+import os
+
+from zim_mcp.file_discovery import FileDiscovery
+
+
+def test_directory_stats_aggregate_the_scan_columns(make_config, zim_dir):
+    os.utime(zim_dir / "alpha.zim", (1_000_000_000, 1_000_000_000))
+    os.utime(zim_dir / "beta.zim", (1_500_000_000, 1_500_000_000))
+    sizes = [(zim_dir / name).stat().st_size for name in ("alpha.zim", "beta.zim")]
+
+    stats = FileDiscovery(make_config()).get_directory_stats()
+
+    assert stats["total_files"] == 2
+    assert stats["total_size"] == sum(sizes)
+    assert stats["max_size"] == max(sizes)
+    assert stats["newest_modified_time"] == 1_500_000_000
+    assert stats["oldest_modified_time"] == 1_000_000_000
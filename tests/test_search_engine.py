@@ -0,0 +1,256 @@
+"""
+Multi-file search merging and entry browsing
+
+Author: mobilemutex
+"""
+
+import shutil
+import threading
+import time
+
+import pytest
+
+from zim_mcp.search_engine import SearchEngine, SearchEngineResult, SearchResultSet, ZimFileTable, _SharedSearch
+from zim_mcp.zim_manager import ZimManager
+
+FILES = ["alpha.zim", "beta.zim"]
+
+
+def make_engine(make_config, **overrides) -> SearchEngine:
+    config = make_config(**overrides)
+    return SearchEngine(config, ZimManager(config))
+
+
+def page(engine, max_results, start_offset=0, zim_files=FILES):
+    return [(result.zim_file, result.path, result.score)
+            for result in engine.search_multiple_zim(zim_files, "apple", max_results, start_offset)]
+
+
+@pytest.mark.parametrize("weights", [{}, {"alpha.zim": 10.0}, {"beta.zim": 2.5}, {"alpha.zim": 0.1}])
+@pytest.mark.parametrize("max_results,start_offset", [(10, 0), (5, 3), (15, 20), (40, 0)])
+def test_parallel_and_sequential_merge_return_the_same_page(make_config, weights, max_results, start_offset):
+    parallel = make_engine(make_config, zim_weights=weights, enable_parallel_search=True)
+    sequential = make_engine(make_config, zim_weights=weights, enable_parallel_search=False)
+
+    expected = page(sequential, max_results, start_offset)
+
+    assert page(parallel, max_results, start_offset) == expected
+    assert len(expected) == min(max_results, max(0, 40 - start_offset))
+
+
+def test_weighted_file_fills_the_page(make_config):
+    engine = make_engine(make_config, zim_weights={"alpha.zim": 10.0})
+
+    results = page(engine, 10)
+
+    assert [zim_file for zim_file, _, _ in results] == ["alpha.zim"] * 10
+    assert [path for _, path, _ in results][:3] == ["A20", "A19", "A18"]
+
+
+def test_equal_weights_interleave_files(make_config):
+    engine = make_engine(make_config)
+
+    results = page(engine, 4)
+
+    assert [zim_file for zim_file, _, _ in results] == ["alpha.zim", "beta.zim"] * 2
+
+
+def browse(engine, **patterns):
+    return [result.path for result in engine.browse_entries_by_pattern("alpha.zim", **patterns)]
+
+
+@pytest.mark.parametrize("patterns,expected", [
+    ({"path_pattern": "A1"}, ["A1"] + [f"A1{i}" for i in range(10)]),
+    ({"path_pattern": "a1"}, ["A1"] + [f"A1{i}" for i in range(10)]),
+    ({"path_pattern": "1"}, ["A1"] + [f"A1{i}" for i in range(10)]),
+    ({"path_pattern": "0"}, ["A10", "A20"]),
+    ({"title_pattern": "rticle 2"}, ["A2", "A20"]),
+    ({"title_pattern": "ALPHA ARTICLE 7"}, ["A7"]),
+    ({"path_pattern": "2", "title_pattern": "article 1"}, ["A12"]),
+    ({"path_pattern": "A", "title_pattern": "rticle 19"}, ["A19"]),
+    ({"path_pattern": "zzz"}, []),
+])
+def test_browse_filters_by_case_insensitive_substrings(make_config, patterns, expected):
+    engine = make_engine(make_config)
+
+    assert sorted(browse(engine, **patterns)) == sorted(expected)
+
+
+def test_browse_respects_limit_without_duplicates(make_config):
+    engine = make_engine(make_config)
+
+    paths = browse(engine, path_pattern="A", title_pattern="alpha", limit=7)
+
+    assert len(paths) == 7
+    assert len(set(paths)) == 7
+
+
+def test_browse_large_archive_samples_random_entries(make_config, monkeypatch):
+    monkeypatch.setattr("zim_mcp.search_engine._BROWSE_SCAN_LIMIT", 0)
+    engine = make_engine(make_config)
+
+    results = engine.browse_entries_by_pattern("alpha.zim", path_pattern="a", title_pattern="ALPHA", limit=5)
+
+    assert len({result.path for result in results}) == 5
+    assert all(result.title.startswith("Alpha Article") for result in results)
+
+
+def test_browse_without_patterns_samples_instead_of_walking(make_config, monkeypatch):
+    engine = make_engine(make_config)
+    monkeypatch.setattr(engine, "_iter_all_entries", lambda archive: pytest.fail("walked the archive"))
+
+    paths = browse(engine, limit=5)
+
+    assert len(set(paths)) == 5
+
+
+def test_browse_scan_stops_at_the_limit(make_config, monkeypatch):
+    monkeypatch.setattr("zim_mcp.search_engine._BROWSE_SCAN_LIMIT", 3)
+    engine = make_engine(make_config)
+    walked = []
+    iter_all_entries = engine._iter_all_entries
+
+    def counting_walk(archive):
+        for entry in iter_all_entries(archive):
+            walked.append(entry.path)
+            yield entry
+
+    monkeypatch.setattr(engine, "_iter_all_entries", counting_walk)
+
+    assert browse(engine, path_pattern="zzz") == []
+    assert len(walked) == 3
+
+
+def test_search_without_archive_returns_no_hits(make_config, monkeypatch):
+    engine = make_engine(make_config)
+    assert engine.search_single_zim("alpha.zim", "apple", 5)
+
+    # The searcher is still cached, but the archive can no longer be opened
+    monkeypatch.setattr(engine.zim_manager, "get_archive", lambda filename: None)
+
+    assert engine.search_single_zim("alpha.zim", "apple", 5, 5) == []
+
+
+def test_missing_file_is_searched_once_it_appears(make_config, zim_dir):
+    engine = make_engine(make_config)
+    assert engine.search_single_zim("gamma.zim", "apple", 5) == []
+    assert page(engine, 10, zim_files=["alpha.zim", "gamma.zim"]) == page(engine, 10, zim_files=["alpha.zim"])
+
+    shutil.copyfile(zim_dir / "beta.zim", zim_dir / "gamma.zim")
+
+    assert "gamma.zim" in {zim_file for zim_file, _, _ in page(engine, 10, zim_files=["alpha.zim", "gamma.zim"])}
+    assert [result.path for result in engine.search_single_zim("gamma.zim", "apple", 2)] == ["B20", "B19"]
+
+
+def test_replaced_file_drops_its_cached_results(make_config, zim_dir):
+    engine = make_engine(make_config)
+    engine.zim_manager.discover_zim_files()
+    assert engine.search_single_zim("alpha.zim", "apple", 1)[0].path == "A20"
+    assert page(engine, 4)[0][1] == "A20"
+
+    replacement = zim_dir / "alpha.zim.new"
+    shutil.copyfile(zim_dir / "beta.zim", replacement)
+    replacement.replace(zim_dir / "alpha.zim")
+    engine.zim_manager.discover_zim_files()
+
+    assert engine.search_single_zim("alpha.zim", "apple", 1)[0].path == "B20"
+    assert [path for _, path, _ in page(engine, 4)] == ["B20", "B20", "B19", "B19"]
+    assert all(result_set.paths[0].startswith("B")
+               for _, result_set in engine.search_cache.items() if len(result_set))
+
+
+def test_searcher_locks_do_not_accumulate(make_config):
+    engine = make_engine(make_config)
+
+    for index in range(50):
+        assert engine.search_single_zim(f"missing{index}.zim", "apple", 5) == []
+    assert engine.search_single_zim("alpha.zim", "apple", 5)
+
+    assert len(engine._searcher_locks) == 0
+
+
+def test_timed_out_fan_out_is_not_cached(make_config, monkeypatch):
+    engine = make_engine(make_config, search_timeout=1)
+    search_single_zim = engine._search_single_zim
+    slow_files = {"beta.zim"}
+
+    def slow_search(zim_file, *args):
+        if zim_file in slow_files:
+            time.sleep(1.5)
+        return search_single_zim(zim_file, *args)
+
+    monkeypatch.setattr(engine, "_search_single_zim", slow_search)
+
+    partial = page(engine, 10)
+    assert {zim_file for zim_file, _, _ in partial} == {"alpha.zim"}
+
+    slow_files.clear()
+    full = page(engine, 10)
+    assert {zim_file for zim_file, _, _ in full} == {"alpha.zim", "beta.zim"}
+
+
+class _SingleThreadedSearch:
+    """Stand-in for a libzim Search that records overlapping use"""
+
+    def __init__(self):
+        self.users = 0
+        self.overlaps = 0
+
+    def _use(self):
+        self.users += 1
+        self.overlaps += self.users > 1
+        time.sleep(0.005)
+        self.users -= 1
+
+    def getEstimatedMatches(self):
+        self._use()
+        return 2
+
+    def getResults(self, start_offset, max_results):
+        self._use()
+        for path in ("A1", "A2"):
+            self._use()
+            yield path
+
+
+def test_shared_search_is_used_by_one_thread_at_a_time():
+    raw_search = _SingleThreadedSearch()
+    search = _SharedSearch(raw_search)
+    pages = []
+
+    def use():
+        for _ in range(5):
+            assert search.estimated_matches() == 2
+            pages.append(search.result_paths(0, 2))
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert raw_search.overlaps == 0
+    assert pages == [["A1", "A2"]] * 20
+
+
+def test_result_set_stores_file_ids_as_uint16():
+    table = ZimFileTable()
+    results = [SearchEngineResult("alpha.zim", "A1", "One", 1.0, rank=0),
+               SearchEngineResult("beta.zim", "B1", "Two", 0.5, is_redirect=True, rank=1)]
+
+    result_set = SearchResultSet(results, table)
+
+    assert result_set.zim_file_ids.typecode == "H"
+    assert result_set.to_results() == results
+
+
+def test_result_set_widens_file_ids_past_uint16():
+    table = ZimFileTable()
+    for index in range(70000):
+        table.id_of(f"file{index}.zim")
+    results = [SearchEngineResult("file0.zim", "A", "A"), SearchEngineResult("late.zim", "B", "B")]
+
+    result_set = SearchResultSet(results, table)
+
+    assert result_set.zim_file_ids.typecode == "L"
+    assert [result.zim_file for result in result_set.to_results()] == ["file0.zim", "late.zim"]
@@ -0,0 +1,105 @@
+"""
+MCP tool behaviour against ZIM files in the server's configured directory
+
+Author: mobilemutex
+"""
+
+import asyncio
+import shutil
+
+import pytest
+
+from conftest import SERVER_ZIM_DIRECTORY, article_html
+from zim_mcp import server
+from zim_mcp.utils import clean_html_content
+
+
+@pytest.fixture
+def server_zims(zim_templates):
+    """Copy alpha.zim and beta.zim into the server directory, resetting caches around each test"""
+    for name in ("alpha.zim", "beta.zim"):
+        shutil.copyfile(zim_templates / name, SERVER_ZIM_DIRECTORY / name)
+    yield SERVER_ZIM_DIRECTORY
+    for path in SERVER_ZIM_DIRECTORY.iterdir():
+        path.unlink()
+    server.zim_manager.clear_caches()
+    server.search_engine.clear_caches()
+    server.content_extractor.clear_caches()
+
+
+def read_entry(zim_file, entry_path, output_format="text"):
+    return asyncio.run(server.read_zim_entry(zim_file, entry_path, output_format))
+
+
+@pytest.mark.parametrize("limit", [0, 1, 5, 40, 100000])
+def test_read_zim_entry_truncates_text_at_limit(server_zims, monkeypatch, limit):
+    monkeypatch.setattr(server.config, "max_content_length", limit)
+    full_text = clean_html_content(article_html("apple", 3, 3))
+
+    result = read_entry("alpha.zim", "A3")
+
+    assert result.status == "success"
+    if len(full_text) > limit:
+        assert result.entry.content == full_text[:limit] + "... [truncated]"
+    else:
+        assert result.entry.content == full_text
+
+
+@pytest.mark.parametrize("limit", [0, 1, 7])
+def test_read_zim_entry_truncates_html_and_raw_at_limit(server_zims, monkeypatch, limit):
+    monkeypatch.setattr(server.config, "max_content_length", limit)
+    html = article_html("apple", 3, 3)
+
+    assert read_entry("alpha.zim", "A3", "html").entry.content == html[:limit] + "... [truncated]"
+    raw = html.encode().hex()
+    assert read_entry("alpha.zim", "A3", "raw").entry.content == raw[:limit] + "... [truncated]"
+
+
+def test_read_zim_entry_rejects_unknown_format(server_zims):
+    assert read_entry("alpha.zim", "A3", "pdf").status == "error"
+
+
+def list_files():
+    return asyncio.run(server.list_zim_files())
+
+
+def test_read_zim_entry_fails_once_the_file_is_removed(server_zims):
+    assert read_entry("alpha.zim", "A3").status == "success"
+
+    (server_zims / "alpha.zim").unlink()
+
+    assert read_entry("alpha.zim", "A3").status == "error"
+    assert read_entry("beta.zim", "B3").status == "success"
+
+
+def test_discovery_drops_cached_contents_of_removed_files(server_zims):
+    assert list_files().count == 2
+    read_entry("alpha.zim", "A3")
+    read_entry("beta.zim", "B3")
+
+    (server_zims / "alpha.zim").unlink()
+
+    assert list_files().count == 1
+    cached_files = {key[0] for key, _ in server._ENTRY_CONTENT_CACHE.items()}
+    assert cached_files == {"beta.zim"}
+    assert "alpha.zim" not in server.zim_manager.archive_cache
+
+
+def test_replaced_file_is_read_afresh(server_zims, zim_templates):
+    list_files()
+    assert read_entry("alpha.zim", "A3").status == "success"
+
+    replacement = server_zims / "alpha.zim.new"
+    shutil.copyfile(zim_templates / "beta.zim", replacement)
+    replacement.replace(server_zims / "alpha.zim")
+
+    assert read_entry("alpha.zim", "A3").status == "error"
+    assert read_entry("alpha.zim", "B3").entry.title == "Beta Article 3"
+
+
+def test_clear_caches_drops_entry_contents(server_zims):
+    read_entry("alpha.zim", "A3")
+
+    server.zim_manager.clear_caches()
+
+    assert server._ENTRY_CONTENT_CACHE.size() == 0
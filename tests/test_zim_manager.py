@@ -0,0 +1,107 @@
+"""
+ZIM file discovery and the persisted file info cache
+
+Author: mobilemutex
+"""
+
+import json
+import threading
+from pathlib import Path
+
+from zim_mcp.config import load_config
+from zim_mcp.zim_manager import ZimManager
+
+
+def test_discovery_is_reused_until_the_directory_changes(make_config, zim_dir):
+    manager = ZimManager(make_config())
+
+    files = manager.discover_zim_files()
+
+    assert sorted(file_info.filename for file_info in files) == ["alpha.zim", "beta.zim"]
+    assert manager.discover_zim_files() is files
+
+    (zim_dir / "beta.zim").unlink()
+    assert [file_info.filename for file_info in manager.discover_zim_files()] == ["alpha.zim"]
+
+
+def test_file_info_cache_persists_across_managers(make_config, zim_dir):
+    cache_file = zim_dir / ".zim_mcp_cache.json"
+    ZimManager(make_config(metadata_cache_file=cache_file)).discover_zim_files()
+
+    persisted = json.loads(cache_file.read_text(encoding="utf-8"))
+    assert sorted(persisted) == ["alpha.zim", "beta.zim"]
+
+    manager = ZimManager(make_config(metadata_cache_file=cache_file))
+    assert manager.file_info_cache.size() == 2
+    assert manager.get_zim_file_info("alpha.zim").title == "alpha"
+
+
+def test_relative_cache_file_in_the_directory_keeps_the_scan(zim_dir, monkeypatch):
+    monkeypatch.chdir(zim_dir.parent)
+    monkeypatch.setenv("ZIM_FILES_DIRECTORY", zim_dir.name)
+    monkeypatch.setenv("METADATA_CACHE_FILE", f"./{zim_dir.name}/.zim_mcp_cache.json")
+    load_config.cache_clear()
+    try:
+        config = load_config()
+    finally:
+        load_config.cache_clear()
+    assert config.metadata_cache_file == zim_dir / ".zim_mcp_cache.json"
+
+    manager = ZimManager(config)
+    files = manager.discover_zim_files()
+
+    # Writing the cache file must not count as a directory change
+    assert manager.discover_zim_files() is files
+
+
+def test_default_cache_file_lives_outside_the_zim_directory(zim_dir, tmp_path_factory, monkeypatch):
+    cache_home = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("ZIM_FILES_DIRECTORY", str(zim_dir))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    monkeypatch.delenv("METADATA_CACHE_FILE")
+    load_config.cache_clear()
+    try:
+        config = load_config()
+    finally:
+        load_config.cache_clear()
+    assert config.metadata_cache_file.parent == cache_home / "zim-mcp"
+
+    directory_mtime = zim_dir.stat().st_mtime_ns
+    ZimManager(config).discover_zim_files()
+
+    assert config.metadata_cache_file.is_file()
+    assert sorted(path.name for path in zim_dir.iterdir()) == ["alpha.zim", "beta.zim"]
+    assert zim_dir.stat().st_mtime_ns == directory_mtime
+
+
+def test_concurrent_saves_leave_one_complete_cache_file(make_config, zim_dir):
+    cache_file = zim_dir / ".zim_mcp_cache.json"
+    manager = ZimManager(make_config(metadata_cache_file=cache_file))
+    manager.discover_zim_files()
+
+    threads = [threading.Thread(target=manager._save_file_info_cache) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(json.loads(cache_file.read_text(encoding="utf-8"))) == ["alpha.zim", "beta.zim"]
+    assert sorted(path.name for path in Path(zim_dir).iterdir()) == [
+        ".zim_mcp_cache.json", "alpha.zim", "beta.zim"
+    ]
+
+
+def test_archive_locks_are_released_after_opening(make_config):
+    manager = ZimManager(make_config())
+    archives = []
+
+    threads = [threading.Thread(target=lambda: archives.append(manager.get_archive("alpha.zim"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    manager.get_archive("./beta.zim")
+    manager.get_archive("missing.zim")
+
+    assert len({id(archive) for archive in archives}) == 1
+    assert len(manager._archive_locks) == 0